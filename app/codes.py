@@ -0,0 +1,33 @@
+"""
+Code normalization helpers shared by the API routes and the in-memory snapshot.
+"""
+import re
+
+_KEY_DELIMITER = re.compile(r"[\s(]")
+
+
+def normalize_code(code: str) -> str:
+    return re.sub(r"\s+", " ", code).strip()
+
+
+def code_key(code: str) -> str:
+    """Canonical lookup key: the code before the first bracket or space, upper-cased.
+
+    ``SR10``, ``SR10 (AAA-2.1)`` and ``SR10(AAA-2.1)`` all share the key ``SR10``,
+    so every variant a client may send resolves through one equality lookup.
+    """
+    return _KEY_DELIMITER.split(normalize_code(code), 1)[0].upper()
+
+
+def matches_source_code(stored: str, requested: str) -> bool:
+    """Python equivalent of the SQL match used by fetch_concept_map.
+
+    Exact match, or a case-insensitive prefix match followed by a bracket or a
+    space, mirroring ``source_code = ? OR source_code LIKE 'X(%' OR LIKE 'X %'``.
+    """
+    if stored == requested:
+        return True
+    stored_lower = stored.lower()
+    requested_lower = requested.lower()
+    return (stored_lower.startswith(requested_lower + "(")
+            or stored_lower.startswith(requested_lower + " "))
@@ -0,0 +1,144 @@
+"""
+FHIR CodeSystem $lookup for the NAMASTE and ICD-11 terminologies.
+"""
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import Annotated, Optional
+
+from app import config, db
+from app.cache import LRUCache
+from app.codes import normalize_code
+from app.conceptmap import ICD11_SYSTEM, NAMASTE_SYSTEM, serialize_resource
+
+router = APIRouter()
+
+NAMASTE_AYURVEDA_SYSTEM = NAMASTE_SYSTEM
+NAMASTE_SIDDHA_SYSTEM = f"{NAMASTE_SYSTEM}/siddha"
+NAMASTE_UNANI_SYSTEM = f"{NAMASTE_SYSTEM}/unani"
+
+# Per system: backing table, code column, and candidate columns in preference
+# order (the CSV releases do not all publish the same set of columns).
+CODE_SYSTEMS = {
+    NAMASTE_AYURVEDA_SYSTEM: {
+        "name": "NAMASTE Ayurveda Morbidity Codes",
+        "table": "nam",
+        "code_column": "namc_code",
+        "display": ["namc_term", "namc_term_diacritical"],
+        "definition": ["short_definition", "long_definition"],
+        "designations": {"hi": "namc_term_devanagari", "en": "name_english"},
+    },
+    NAMASTE_SIDDHA_SYSTEM: {
+        "name": "NAMASTE Siddha Morbidity Codes",
+        "table": "nsm",
+        "code_column": "namc_code",
+        "display": ["namc_term", "namc_term_diacritical"],
+        "definition": ["short_definition", "long_definition"],
+        "designations": {"ta": "namc_term_tamil", "en": "name_english"},
+    },
+    NAMASTE_UNANI_SYSTEM: {
+        "name": "NAMASTE Unani Morbidity Codes",
+        "table": "num",
+        "code_column": "numc_code",
+        "display": ["numc_term", "numc_term_diacritical", "short_definition"],
+        "definition": ["short_definition", "long_definition"],
+        "designations": {"ar": "numc_term_arabic", "en": "name_english"},
+    },
+    ICD11_SYSTEM: {
+        "name": "ICD-11 Traditional Medicine Module 2",
+        "table": "icd11",
+        "code_column": "code",
+        "display": ["title"],
+        "definition": ["definition", "description"],
+        "designations": {},
+    },
+}
+
+# Serialized $lookup results shared by every code system,
+# keyed by (system, normalized code, database version)
+lookup_cache = LRUCache(config.LOOKUP_CACHE_MAX_ENTRIES, config.LOOKUP_CACHE_MAX_BYTES)
+
+
+def _first_value(record: dict, columns):
+    for column in columns:
+        value = record.get(column)
+        if value not in (None, ""):
+            return str(value)
+    return None
+
+
+def fetch_code_record(system: str, code: str) -> Optional[dict]:
+    """Row for ``code`` in the table backing ``system``, as a column dict"""
+    spec = CODE_SYSTEMS[system]
+    with db.connection() as conn:
+        cur = conn.execute(
+            f"SELECT * FROM {spec['table']} WHERE {spec['code_column']} = ? LIMIT 1", (code,)
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return {description[0]: value for description, value in zip(cur.description, row)}
+
+
+def lookup_code(system: str, code: str) -> Optional[dict]:
+    """Build the $lookup Parameters resource, or None if the code is unknown"""
+    # Source tables keep the release's original spacing, so try the code as
+    # sent before its whitespace-normalized form
+    record = None
+    for candidate in dict.fromkeys([code.strip(), normalize_code(code)]):
+        record = fetch_code_record(system, candidate)
+        if record is not None:
+            code = candidate
+            break
+    if record is None:
+        return None
+
+    spec = CODE_SYSTEMS[system]
+    parameters = [
+        {"name": "name", "valueString": spec["name"]},
+        {"name": "code", "valueCode": code},
+        {"name": "system", "valueUri": system},
+    ]
+    display = _first_value(record, spec["display"])
+    if display:
+        parameters.append({"name": "display", "valueString": display})
+    definition = _first_value(record, spec["definition"])
+    if definition:
+        parameters.append({"name": "definition", "valueString": definition})
+    for language, column in spec["designations"].items():
+        value = _first_value(record, [column])
+        if value:
+            parameters.append({
+                "name": "designation",
+                "part": [
+                    {"name": "language", "valueCode": language},
+                    {"name": "value", "valueString": value},
+                ]
+            })
+    return {"resourceType": "Parameters", "parameter": parameters}
+
+
+def lookup_code_body(system: str, code: str) -> Optional[bytes]:
+    parameters = lookup_code(system, code)
+    return serialize_resource(parameters) if parameters is not None else None
+
+
+@router.get("/CodeSystem/$lookup")
+async def read_code_lookup(
+    system: Annotated[str, Query()],
+    code: Annotated[str, Query()]
+):
+    """FHIR CodeSystem $lookup for NAMASTE (nam, nsm, num) and ICD-11 codes"""
+    if system not in CODE_SYSTEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown code system: {system}. Supported: {', '.join(CODE_SYSTEMS)}"
+        )
+    cache_key = (system, code.strip(), db.database_version(db.file_signature(config.DB_PATH)))
+
+    body = lookup_cache.get(cache_key)
+    if body is None:
+        body = await db.run_blocking(lookup_code_body, system, code)
+        if body is None:
+            raise HTTPException(status_code=404, detail=f"Code not found in {system}: {code}")
+        lookup_cache.put(cache_key, body)
+
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,85 @@
+"""
+Accept-Encoding negotiation for precompressed response bodies.
+
+Cached and pre-rendered bodies are compressed once, when they are built, and
+kept next to the identity bytes; requests only choose which copy to send.
+"""
+import gzip
+from typing import Optional
+
+from fastapi import Response
+
+from app import config
+
+
+class EncodedBody:
+    """A serialized response body plus its gzip form, if worth keeping."""
+
+    __slots__ = ("identity", "gzip")
+
+    def __init__(self, identity: bytes, gzip_body: Optional[bytes] = None):
+        self.identity = identity
+        self.gzip = gzip_body
+
+    @classmethod
+    def build(cls, body: bytes, gzip_body: Optional[bytes] = None) -> "EncodedBody":
+        """Wrap ``body``, compressing it unless it is too small to benefit"""
+        if gzip_body is None and len(body) >= config.GZIP_MIN_SIZE:
+            gzip_body = compress(body)
+            if len(gzip_body) >= len(body):
+                gzip_body = None
+        return cls(body, gzip_body)
+
+    def __len__(self):
+        # Counts both copies so cache byte budgets stay honest
+        return len(self.identity) + len(self.gzip or b"")
+
+
+def compress(body: bytes) -> bytes:
+    # mtime=0 keeps the output deterministic for a given body
+    return gzip.compress(body, compresslevel=config.GZIP_LEVEL, mtime=0)
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows a gzip response"""
+    if not accept_encoding:
+        return False
+    wildcard = None
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding in ("gzip", "x-gzip"):
+            return quality > 0
+        if coding == "*":
+            wildcard = quality > 0
+    return bool(wildcard)
+
+
+def gzip_etag(etag: str) -> str:
+    """Distinct strong ETag for the gzip representation of ``etag``"""
+    return f'{etag[:-1]}-gzip"'
+
+
+def encoded_response(
+    body: EncodedBody,
+    accept_encoding: Optional[str],
+    etag: Optional[str] = None,
+    media_type: str = "application/json"
+) -> Response:
+    """Send the stored gzip bytes when the client accepts them, else identity"""
+    headers = {"Vary": "Accept-Encoding"}
+    if body.gzip is not None and accepts_gzip(accept_encoding):
+        headers["Content-Encoding"] = "gzip"
+        if etag is not None:
+            headers["ETag"] = gzip_etag(etag)
+        return Response(content=body.gzip, media_type=media_type, headers=headers)
+    if etag is not None:
+        headers["ETag"] = etag
+    return Response(content=body.identity, media_type=media_type, headers=headers)
@@ -1,100 +1,524 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Body, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from urllib.parse import unquote, urlencode
+from typing import TYPE_CHECKING, Annotated, Any, List, Optional
+import bisect
+import gzip
+import json
+import logging
 import sqlite3
-from urllib.parse import unquote
-from fhir.resources.conceptmap import ConceptMap, ConceptMapGroup, ConceptMapGroupElement, ConceptMapGroupElementTarget
-from fhir.resources.bundle import Bundle, BundleEntry
-from typing import List
-import uuid
-from datetime import datetime
-import re
 
-DB_PATH = "db/ayush_icd11_combined.db"
+from app import config, db, metrics, profiling, snapshot
+from app.cache import LRUCache
+from app.compression import EncodedBody, encoded_response, gzip_etag
+from app.codes import code_key, matches_source_code, normalize_code
+
+if TYPE_CHECKING:
+    from fhir.resources.conceptmap import ConceptMap
+
+DB_PATH = config.DB_PATH
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def normalize_code(code: str) -> str:
-    return re.sub(r"\s+", " ", code).strip()
+# Keeps IN (...) lists well below SQLite's bound parameter limit
+BULK_CHUNK_SIZE = 500
+
+CONCEPT_MAP_VERSION = "1.0.0"
+
+NAMASTE_SYSTEM = "http://namaste.terminology/CodeSystem"
+ICD11_SYSTEM = "http://id.who.int/icd/release/11/mms"
+
+# Serialized response bodies (EncodedBody, identity plus gzip) keyed by
+# (normalized code, database version); listing and $translate keys are
+# prefixed with their route
+response_cache = LRUCache(config.RESPONSE_CACHE_MAX_ENTRIES, config.RESPONSE_CACHE_MAX_BYTES)
+
+# Try multiple search patterns to handle variations in spacing and format.
+# source_key narrows the match to one indexed bucket; the remaining predicates
+# keep the exact/prefix semantics for codes such as "SR10 (AAA-2.1)".
+_SOURCE_CODE_MATCH = """
+    cm.source_key = ?
+    AND (cm.source_code = ? OR cm.source_code LIKE ? OR cm.source_code LIKE ?)
+"""
+
+# Fallback for databases generated before concept_map.source_key existed
+_LEGACY_SOURCE_CODE_MATCH = """
+    ? IS NOT NULL
+    AND (cm.source_code = ? OR cm.source_code LIKE ? OR cm.source_code LIKE ?)
+"""
+
+# Optional schema features, checked once per process
+_schema_features = {}
+_schema_signature = None
+
+
+def _schema_has(table: str, column: Optional[str] = None) -> bool:
+    """Whether the served database has ``table`` (and ``column``)
+
+    Answers are cached until the database file changes, so a database
+    regenerated under a running server, e.g. with render_concept_maps, is
+    picked up without a restart.
+    """
+    global _schema_signature
+    signature = db.file_signature(config.DB_PATH)
+    if signature != _schema_signature:
+        _schema_features.clear()
+        _schema_signature = signature
+    feature = (table, column)
+    if feature not in _schema_features:
+        with db.connection() as conn:
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        _schema_features[feature] = bool(columns) and (column is None or column in columns)
+    return _schema_features[feature]
+
+
+def _source_key_available() -> bool:
+    return _schema_has("concept_map", "source_key")
+
+
+def _source_code_match() -> str:
+    return _SOURCE_CODE_MATCH if _source_key_available() else _LEGACY_SOURCE_CODE_MATCH
+
 
+def _source_code_params(source_code: str):
+    return (code_key(source_code), source_code, f"{source_code}(%", f"{source_code} %")
 
+
+@metrics.timed_query("fetch_concept_map")
 def fetch_concept_map(source_code: str):
     source_code = normalize_code(source_code)
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    # Try multiple search patterns to handle variations in spacing and format
-    cur.execute("""
-        SELECT source_code, target_code, equivalence
-        FROM concept_map
-        WHERE source_code = ? 
-           OR source_code LIKE ?
-           OR source_code LIKE ?
-           OR source_code LIKE ?
-    """, (source_code, f"{source_code}(%", f"{source_code} %", f"{source_code}(%"))
-    
-    rows = cur.fetchall()
-    conn.close()
+    current = snapshot.current()
+    if current is not None:
+        return [record[:3] for record in current.concept_map(source_code)]
+
+    with db.connection() as conn:
+        rows = conn.execute(f"""
+            SELECT cm.source_code, cm.target_code, cm.equivalence
+            FROM concept_map cm
+            WHERE {_source_code_match()}
+            ORDER BY cm.id
+        """, _source_code_params(source_code)).fetchall()
+
     return [(normalize_code(r[0]), r[1], r[2]) for r in rows]
 
+@metrics.timed_query("fetch_concept_map_with_displays")
+def fetch_concept_map_with_displays(source_code: str):
+    """Fetch mappings together with their NAMASTE term and ICD-11 title.
+
+    Returns (source_code, target_code, equivalence, namaste_term, icd11_title)
+    tuples resolved in a single query instead of one display lookup per row.
+    """
+    source_code = normalize_code(source_code)
+
+    current = snapshot.current()
+    if current is not None:
+        return current.concept_map(source_code)
+
+    with db.connection() as conn:
+        rows = conn.execute(f"""
+            SELECT cm.source_code, cm.target_code, cm.equivalence,
+                   (SELECT n.namc_term FROM nam n WHERE n.namc_code = cm.source_code LIMIT 1),
+                   (SELECT i.title FROM icd11 i WHERE i.code = cm.target_code LIMIT 1)
+            FROM concept_map cm
+            WHERE {_source_code_match()}
+            ORDER BY cm.id
+        """, _source_code_params(source_code)).fetchall()
+
+    return [(normalize_code(r[0]), r[1], r[2], r[3], r[4]) for r in rows]
+
+@metrics.timed_query("fetch_concept_maps_bulk")
+def fetch_concept_maps_bulk(source_codes):
+    """Resolve many source codes with one set-based query per chunk.
+
+    Returns {normalized code: rows} where rows have the shape of
+    fetch_concept_map_with_displays. Candidate rows are fetched by
+    source_key IN (...) and matched to each requested code in Python.
+    """
+    lookup_codes = list(dict.fromkeys(normalize_code(code) for code in source_codes))
+    current = snapshot.current()
+    if current is not None:
+        return {code: current.concept_map(code) for code in lookup_codes}
+    if not _source_key_available():
+        return {code: fetch_concept_map_with_displays(code) for code in lookup_codes}
+
+    keys = sorted({code_key(code) for code in lookup_codes})
+    candidates = {}
+    with db.connection() as conn:
+        for start in range(0, len(keys), BULK_CHUNK_SIZE):
+            chunk = keys[start:start + BULK_CHUNK_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = conn.execute(f"""
+                SELECT cm.source_key, cm.source_code, cm.target_code, cm.equivalence,
+                       (SELECT n.namc_term FROM nam n WHERE n.namc_code = cm.source_code LIMIT 1),
+                       (SELECT i.title FROM icd11 i WHERE i.code = cm.target_code LIMIT 1)
+                FROM concept_map cm
+                WHERE cm.source_key IN ({placeholders})
+                ORDER BY cm.id
+            """, chunk).fetchall()
+            for r in rows:
+                candidates.setdefault(r[0], []).append(
+                    (normalize_code(r[1]), r[2], r[3], r[4], r[5])
+                )
+
+    return {
+        code: [row for row in candidates.get(code_key(code), ()) if matches_source_code(row[0], code)]
+        for code in lookup_codes
+    }
+
+@metrics.timed_query("fetch_reverse_concept_map")
+def fetch_reverse_concept_map(target_code: str):
+    """Fetch the NAMASTE mappings onto an ICD-11 code (reverse translation)
+
+    Rows have the shape of fetch_concept_map_with_displays and are served by
+    the idx_concept_map_target_code covering index.
+    """
+    target_code = normalize_code(target_code)
+
+    current = snapshot.current()
+    if current is not None:
+        return current.reverse_concept_map(target_code)
+
+    with db.connection() as conn:
+        rows = conn.execute("""
+            SELECT cm.source_code, cm.target_code, cm.equivalence,
+                   (SELECT n.namc_term FROM nam n WHERE n.namc_code = cm.source_code LIMIT 1),
+                   (SELECT i.title FROM icd11 i WHERE i.code = cm.target_code LIMIT 1)
+            FROM concept_map cm
+            WHERE cm.target_code = ?
+            ORDER BY cm.id
+        """, (target_code,)).fetchall()
+
+    return [(normalize_code(r[0]), r[1], r[2], r[3], r[4]) for r in rows]
+
+def data_signature():
+    """File signature of the data currently being served"""
+    current = snapshot.current()
+    if current is not None:
+        return current.signature
+    return db.file_signature(config.DB_PATH)
+
+_release_date = (None, None)
+
+def release_date() -> str:
+    """Date stamped on ConceptMaps: the one recorded with the pre-rendered
+    bodies, or the database file's date when nothing has been rendered"""
+    global _release_date
+    current = snapshot.current()
+    if current is not None:
+        return current.release_dates.get(CONCEPT_MAP_VERSION) or db.version_date(current.signature)
+    signature = db.file_signature(config.DB_PATH)
+    cached_signature, date = _release_date
+    if cached_signature != signature:
+        with db.connection() as conn:
+            date = db.release_dates(conn).get(CONCEPT_MAP_VERSION) or db.version_date(signature)
+        _release_date = (signature, date)
+    return date
+
+@metrics.timed_query("fetch_namaste_term")
 def fetch_namaste_term(namc_code: str):
     """Fetch the NAMASTE term for a given code"""
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    
-    cur.execute("SELECT namc_term FROM nam WHERE namc_code = ? LIMIT 1", (namc_code,))
-    result = cur.fetchone()
-    conn.close()
-    
+    current = snapshot.current()
+    if current is not None:
+        return current.namaste_term(namc_code)
+
+    with db.connection() as conn:
+        result = conn.execute(
+            "SELECT namc_term FROM nam WHERE namc_code = ? LIMIT 1", (namc_code,)
+        ).fetchone()
+
     return result[0] if result else None
 
+@metrics.timed_query("fetch_icd11_title")
 def fetch_icd11_title(icd_code: str):
     """Fetch the ICD-11 title for a given code"""
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    
-    cur.execute("SELECT title FROM icd11 WHERE code = ? LIMIT 1", (icd_code,))
-    result = cur.fetchone()
-    conn.close()
-    
+    current = snapshot.current()
+    if current is not None:
+        return current.icd11_title(icd_code)
+
+    with db.connection() as conn:
+        result = conn.execute(
+            "SELECT title FROM icd11 WHERE code = ? LIMIT 1", (icd_code,)
+        ).fetchone()
+
     return result[0] if result else None
 
+@metrics.timed_query("fetch_source_codes_page")
+def fetch_source_codes_page(after: Optional[str], limit: int) -> List[str]:
+    """Keyset page of distinct source codes strictly after ``after``"""
+    current = snapshot.current()
+    if current is not None:
+        codes = current.source_codes()
+        start = bisect.bisect_right(codes, after) if after is not None else 0
+        return list(codes[start:start + limit])
+
+    with db.connection() as conn:
+        rows = conn.execute("""
+            SELECT DISTINCT source_code FROM concept_map
+            WHERE source_code > ?
+            ORDER BY source_code
+            LIMIT ?
+        """, (after if after is not None else "", limit)).fetchall()
+    return [row[0] for row in rows]
+
+@metrics.timed_query("count_source_codes")
+def count_source_codes() -> int:
+    current = snapshot.current()
+    if current is not None:
+        return len(current.source_codes())
+
+    with db.connection() as conn:
+        return conn.execute("SELECT COUNT(DISTINCT source_code) FROM concept_map").fetchone()[0]
+
+def _listing_url(count: int, cursor: Optional[str] = None) -> str:
+    params = {"_count": count}
+    if cursor is not None:
+        params["cursor"] = cursor
+    return f"/ConceptMap?{urlencode(params)}"
+
+async def _run(func, *args):
+    """Call a data-access helper without blocking the event loop.
+
+    Snapshot lookups are pure in-memory work and run inline; everything else
+    goes through the bounded database executor.
+    """
+    if snapshot.current() is not None:
+        return func(*args)
+    return await db.run_blocking(func, *args)
+
+async def _stream_ndjson(batch_size: int = 500):
+    """Yield every source code as NDJSON, one keyset batch at a time.
+
+    A connection is only borrowed while a batch is fetched, so slow streaming
+    clients never pin pooled connections and memory stays bounded by the batch.
+    """
+    after = None
+    while True:
+        page = await _run(fetch_source_codes_page, after, batch_size)
+        for code in page:
+            yield json.dumps({"code": code}, ensure_ascii=False).encode("utf-8") + b"\n"
+        if len(page) < batch_size:
+            return
+        after = page[-1]
+
 @router.get("/ConceptMap")
-def list_all_concept_maps():
-    """List all available concept mappings as FHIR Bundle"""
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    
-    cur.execute("SELECT DISTINCT source_code FROM concept_map ORDER BY source_code")
-    codes = [row[0] for row in cur.fetchall()]
-    conn.close()
+async def read_concept_map_listing(
+    count: Annotated[Optional[int], Query(alias="_count", ge=1)] = None,
+    cursor: Annotated[Optional[str], Query()] = None,
+    output_format: Annotated[Optional[str], Query(alias="_format")] = None,
+    accept_encoding: Annotated[Optional[str], Header()] = None
+):
+    """List available concept mappings as a paginated FHIR Bundle
+
+    ``_count`` sets the page size and ``cursor`` continues after the last code
+    of the previous page. ``_format=ndjson`` streams every code instead.
+    """
+    if output_format == "ndjson":
+        return StreamingResponse(_stream_ndjson(), media_type="application/x-ndjson")
+
+    cache_key = ("listing", count, cursor, db.database_version(data_signature()))
+    body = response_cache.get(cache_key)
+    if body is None:
+        body = await _run(render_listing_body, count, cursor)
+        response_cache.put(cache_key, body)
+    return encoded_response(body, accept_encoding)
+
+def prime_response_cache(codes) -> int:
+    """Render the first listing page and ``codes`` into the response cache
+
+    Uses the same cache keys as the routes; returns how many ConceptMaps
+    were cached.
+    """
+    version = db.database_version(data_signature())
+    response_cache.put(("listing", None, None, version), render_listing_body())
+    primed = 0
+    for code in codes:
+        lookup_code = normalize_code(code)
+        try:
+            body = render_concept_map_body(lookup_code)
+        except HTTPException:
+            continue
+        response_cache.put((lookup_code, version), body)
+        primed += 1
+    return primed
+
+def render_listing_body(count: Optional[int] = None, cursor: Optional[str] = None) -> EncodedBody:
+    return EncodedBody.build(serialize_resource(list_all_concept_maps(count, cursor)))
+
+def list_all_concept_maps(count: Optional[int] = None, cursor: Optional[str] = None):
+    """Build one page of the concept mapping listing as a FHIR Bundle"""
+    count = min(count or config.LIST_DEFAULT_COUNT, config.LIST_MAX_COUNT)
+    # Fetch one extra code to know whether a next page exists
+    codes = fetch_source_codes_page(cursor, count + 1)
+    has_next = len(codes) > count
+    codes = codes[:count]
+
+    links = [{"relation": "self", "url": _listing_url(count, cursor)}]
+    if has_next:
+        links.append({"relation": "next", "url": _listing_url(count, codes[-1])})
     
     # Return simple JSON response instead of complex Bundle for listing
     return {
         "resourceType": "Bundle",
         "type": "searchset", 
-        "total": len(codes),
+        "total": count_source_codes(),
+        "link": links,
         "available_codes": codes,
         "message": "Use /ConceptMap/{code} to get specific FHIR ConceptMap resources"
     }
-    
-    return bundle.dict()
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag == etag or tag == f"W/{etag}" for tag in candidates)
+
+@router.get("/ConceptMap/$translate")
+async def read_translation(
+    code: Annotated[str, Query(min_length=1)],
+    system: Annotated[Optional[str], Query()] = None,
+    reverse: Annotated[bool, Query()] = False,
+    accept_encoding: Annotated[Optional[str], Header()] = None
+):
+    """FHIR $translate for one code, returned as a Parameters resource
+
+    ``reverse=true`` treats ``code`` as an ICD-11 target and returns the
+    NAMASTE codes mapped onto it.
+    """
+    expected_system = ICD11_SYSTEM if reverse else NAMASTE_SYSTEM
+    if system is not None and system != expected_system:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{'Reverse' if reverse else 'Forward'} translation expects system {expected_system}"
+        )
+    lookup_code = normalize_code(code)
+    cache_key = ("$translate", reverse, lookup_code, db.database_version(data_signature()))
+    body = response_cache.get(cache_key)
+    if body is None:
+        body = EncodedBody.build(serialize_resource(await _run(translate_code, lookup_code, reverse)))
+        response_cache.put(cache_key, body)
+    return encoded_response(body, accept_encoding)
+
+def translate_code(code: str, reverse: bool = False) -> dict:
+    """Build the $translate Parameters for one code in either direction"""
+    if reverse:
+        rows = fetch_reverse_concept_map(code)
+    else:
+        rows = fetch_concept_map_with_displays(code)
+
+    parameters = [{"name": "result", "valueBoolean": bool(rows)}]
+    if not rows:
+        parameters.append({"name": "message", "valueString": f"No mapping found for code: {normalize_code(code)}"})
+    for source_code, target_code, equivalence, namaste_term, icd11_title in rows:
+        if reverse:
+            concept = {"system": NAMASTE_SYSTEM, "code": source_code,
+                       "display": namaste_term or f"NAMASTE code {source_code}"}
+        else:
+            concept = {"system": ICD11_SYSTEM, "code": target_code,
+                       "display": icd11_title or f"ICD-11 code {target_code}"}
+        parameters.append({
+            "name": "match",
+            "part": [
+                {"name": "equivalence", "valueCode": equivalence},
+                {"name": "concept", "valueCoding": concept},
+                {"name": "source", "valueUri": _concept_map_url(source_code)},
+            ]
+        })
+    return {"resourceType": "Parameters", "parameter": parameters}
 
 @router.get("/ConceptMap/{source_code}")
-def get_concept_map(source_code: str):
+async def read_concept_map(
+    source_code: str,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    accept_encoding: Annotated[Optional[str], Header()] = None,
+    profile: Annotated[Optional[str], Query(alias="_profile")] = None,
+    x_profile: Annotated[Optional[str], Header()] = None
+):
     """Get FHIR ConceptMap for a specific source code"""
-    # URL decode the source code (handles %28 = ( and %29 = ))
-    decoded_source_code = unquote(source_code)
-    
-    rows = fetch_concept_map(decoded_source_code)
-    if not rows:
-        raise HTTPException(status_code=404, detail=f"Mapping not found for code: {decoded_source_code}")
+    profile_mode = profiling.requested_mode(profile, x_profile)
+    if profile_mode is not None:
+        return await _run(profile_concept_map, source_code, profile_mode == profiling.CPROFILE)
+
+    lookup_code = normalize_code(unquote(source_code))
+    version = db.database_version(data_signature())
+    etag = f'"{version}"'
+
+    # Revalidation never touches the database; either encoding's tag matches
+    for candidate in (etag, gzip_etag(etag)):
+        if _etag_matches(if_none_match, candidate):
+            return Response(status_code=304, headers={"ETag": candidate, "Vary": "Accept-Encoding"})
+
+    cache_key = (lookup_code, version)
+    body = response_cache.get(cache_key)
+    if body is None:
+        body = await _run(render_concept_map_body, lookup_code)
+        response_cache.put(cache_key, body)
+
+    return encoded_response(body, accept_encoding, etag=etag)
+
+def _concept_map_id(lookup_code: str) -> str:
+    return f"namaste-to-icd11-{lookup_code.replace('(', '').replace(')', '').replace(' ', '-')}"
+
+def _concept_map_url(lookup_code: str) -> str:
+    return f"http://namaste.terminology/ConceptMap/{_concept_map_id(lookup_code)}"
+
+def _concept_map_metadata(lookup_code: str, date: str) -> dict:
+    """Top-level ConceptMap fields shared by the validating and fast paths"""
+    # Proper FHIR R4 fields (no top-level source/target URIs - they go in the group)
+    return {
+        "id": _concept_map_id(lookup_code),
+        "url": _concept_map_url(lookup_code),
+        "version": CONCEPT_MAP_VERSION,
+        "name": f"NAMASTE_{lookup_code.replace('(', '_').replace(')', '_').replace(' ', '_')}_to_ICD11",
+        "title": f"NAMASTE {lookup_code} to ICD-11 TM2 Concept Mapping",
+        "status": "active",
+        "date": date,
+        "publisher": "NAMASTE-ICD-11 Integration Service",
+        "description": f"Concept mapping from NAMASTE Ayurveda code {lookup_code} to ICD-11 Traditional Medicine 2 (TM2) codes",
+    }
+
+def _replace_relationship_with_equivalence(obj):
+    """Rename the library's 'relationship' keys to FHIR R4 'equivalence'"""
+    if isinstance(obj, dict):
+        new = {}
+        for k, v in obj.items():
+            new_key = 'equivalence' if k == 'relationship' else k
+            new[new_key] = _replace_relationship_with_equivalence(v)
+        return new
+    elif isinstance(obj, list):
+        return [_replace_relationship_with_equivalence(i) for i in obj]
+    else:
+        return obj
+
+def _build_concept_map_model(lookup_code: str, rows, date: str, timer=None) -> dict:
+    """Validating path: build fhir.resources models, then serialize"""
+    with profiling.stage(timer, "model_construction"):
+        concept_map = _concept_map_model(lookup_code, rows, date)
+
+    # Serialize via the FHIR model (validates fields) then convert any
+    # 'relationship' keys emitted by the model into FHIR-standard
+    # 'equivalence' keys for downstream consumers expecting R4 naming.
+    with profiling.stage(timer, "model_dict"):
+        serialized = concept_map.dict()
+    with profiling.stage(timer, "relationship_rewrite"):
+        return _replace_relationship_with_equivalence(serialized)
+
+def _concept_map_model(lookup_code: str, rows, date: str) -> "ConceptMap":
+    # fhir.resources is slow to import and only this validating path uses it,
+    # so it is loaded on first use rather than at startup
+    from fhir.resources.conceptmap import (
+        ConceptMap, ConceptMapGroup, ConceptMapGroupElement, ConceptMapGroupElementTarget
+    )
 
-    # Build proper FHIR ConceptMap
     elements = []
-    for source_code, target_code, equivalence in rows:
-        # Get display names from database
-        source_display = fetch_namaste_term(source_code) or f"NAMASTE code {source_code}"
-        target_display = fetch_icd11_title(target_code) or f"ICD-11 code {target_code}"
+    for source_code, target_code, equivalence, namaste_term, icd11_title in rows:
+        source_display = namaste_term or f"NAMASTE code {source_code}"
+        target_display = icd11_title or f"ICD-11 code {target_code}"
         
         # Create target mapping
         # The installed FHIR model expects the field name 'relationship' rather
@@ -117,42 +541,229 @@ def get_concept_map(source_code: str):
     
     # Create group
     group = ConceptMapGroup(
-        source="http://namaste.terminology/CodeSystem",
-        target="http://id.who.int/icd/release/11/mms",
+        source=NAMASTE_SYSTEM,
+        target=ICD11_SYSTEM,
         element=elements
     )
     
-    # Create ConceptMap with proper FHIR R4 fields (no top-level source/target URIs)
-    concept_map_id = f"namaste-to-icd11-{decoded_source_code.replace('(', '').replace(')', '').replace(' ', '-')}"
+    return ConceptMap(**_concept_map_metadata(lookup_code, date), group=[group])
+
+def _emit_concept_map(lookup_code: str, rows, date: str) -> dict:
+    """Fast path: emit the serialized ConceptMap shape directly.
+
+    Produces exactly what _build_concept_map_model returns, without pydantic
+    model construction or the second tree walk that renames 'relationship'.
+    """
+    elements = [
+        {
+            "code": source_code,
+            "display": namaste_term or f"NAMASTE code {source_code}",
+            "target": [
+                {
+                    "code": target_code,
+                    "display": icd11_title or f"ICD-11 code {target_code}",
+                    "equivalence": equivalence,
+                }
+            ],
+        }
+        for source_code, target_code, equivalence, namaste_term, icd11_title in rows
+    ]
+    return {
+        "resourceType": "ConceptMap",
+        **_concept_map_metadata(lookup_code, date),
+        "group": [
+            {
+                "source": NAMASTE_SYSTEM,
+                "target": ICD11_SYSTEM,
+                "element": elements,
+            }
+        ],
+    }
+
+def fetch_rendered_concept_map(lookup_code: str) -> Optional[bytes]:
+    """Pre-rendered ConceptMap body from concept_map_rendered, if materialized"""
+    row = _fetch_rendered_row(lookup_code)
+    if row is None:
+        return None
+    body, encoding = row
+    return gzip.decompress(body) if encoding == "gzip" else body
+
+@metrics.timed_query("fetch_rendered_concept_map")
+def _fetch_rendered_row(lookup_code: str):
+    """(body, encoding) as stored in concept_map_rendered, or None"""
+    if snapshot.current() is not None or not _schema_has("concept_map_rendered"):
+        return None
+    try:
+        with db.connection() as conn:
+            row = conn.execute(
+                "SELECT body, encoding FROM concept_map_rendered WHERE lookup_code = ? AND version = ?",
+                (lookup_code, CONCEPT_MAP_VERSION)
+            ).fetchone()
+    except sqlite3.OperationalError:
+        # Database rebuilt without the materialized table since startup
+        return None
+    return row
+
+def render_concept_map_body(lookup_code: str) -> EncodedBody:
+    """Serialized ConceptMap: pre-rendered bytes if available, else built now
+
+    Bodies materialized with --compress already hold the gzip bytes, so only
+    the identity copy has to be recovered.
+    """
+    row = _fetch_rendered_row(lookup_code)
+    if row is None:
+        return EncodedBody.build(serialize_resource(get_concept_map(lookup_code)))
+    body, encoding = row
+    if encoding == "gzip":
+        return EncodedBody(gzip.decompress(body), body)
+    return EncodedBody.build(body)
+
+def get_concept_map(source_code: str, validate: Optional[bool] = None):
+    """Build the FHIR ConceptMap for a specific source code
+
+    ``validate`` chooses between fhir.resources model validation and the fast
+    dict emitter; it defaults to ``config.CONCEPTMAP_VALIDATE``.
+    """
+    # URL decode the source code (handles %28 = ( and %29 = ))
+    decoded_source_code = normalize_code(unquote(source_code))
     
-    concept_map = ConceptMap(
-        id=concept_map_id,
-        url=f"http://namaste.terminology/ConceptMap/{concept_map_id}",
-        version="1.0.0", 
-        name=f"NAMASTE_{decoded_source_code.replace('(', '_').replace(')', '_').replace(' ', '_')}_to_ICD11",
-        title=f"NAMASTE {decoded_source_code} to ICD-11 TM2 Concept Mapping",
-        status="active",
-        date=datetime.now().date().isoformat(),
-        publisher="NAMASTE-ICD-11 Integration Service",
-        description=f"Concept mapping from NAMASTE Ayurveda code {decoded_source_code} to ICD-11 Traditional Medicine 2 (TM2) codes",
-        # Note: No sourceUri/targetUri at top level - they go in the group
-        group=[group]
-    )
+    rows = fetch_concept_map_with_displays(decoded_source_code)
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"Mapping not found for code: {decoded_source_code}")
 
-    # Serialize via the FHIR model (validates fields) then convert any
-    # 'relationship' keys emitted by the model into FHIR-standard
-    # 'equivalence' keys for downstream consumers expecting R4 naming.
-    def _replace_relationship_with_equivalence(obj):
-        if isinstance(obj, dict):
-            new = {}
-            for k, v in obj.items():
-                new_key = 'equivalence' if k == 'relationship' else k
-                new[new_key] = _replace_relationship_with_equivalence(v)
-            return new
-        elif isinstance(obj, list):
-            return [_replace_relationship_with_equivalence(i) for i in obj]
+    return _concept_map_from_rows(decoded_source_code, rows, validate)
+
+def profile_concept_map(source_code: str, dump: bool = False) -> Response:
+    """Build a ConceptMap uncached, timing each stage of the pipeline
+
+    Display names are resolved one lookup per row here (not batched) so their
+    cost shows up as its own stage. The breakdown is returned in a
+    Server-Timing header and logged; ``dump`` also writes a cProfile file.
+    """
+    timer = profiling.StageTimer()
+    validate = config.CONCEPTMAP_VALIDATE
+    with profiling.cprofile_dump(f"conceptmap-{source_code}", dump) as dump_result:
+        with timer.stage("normalize_code"):
+            lookup_code = normalize_code(unquote(source_code))
+        with timer.stage("fetch_rendered_concept_map"):
+            fetch_rendered_concept_map(lookup_code)
+        with timer.stage("fetch_concept_map"):
+            mappings = fetch_concept_map(lookup_code)
+        if not mappings:
+            raise HTTPException(status_code=404, detail=f"Mapping not found for code: {lookup_code}")
+        with timer.stage("display_lookups"):
+            rows = [
+                (source, target, equivalence, fetch_namaste_term(source), fetch_icd11_title(target))
+                for source, target, equivalence in mappings
+            ]
+        date = release_date()
+        if validate:
+            resource = _build_concept_map_model(lookup_code, rows, date, timer)
         else:
-            return obj
+            with timer.stage("emit"):
+                resource = _emit_concept_map(lookup_code, rows, date)
+        with timer.stage("serialize"):
+            body = serialize_resource(resource)
 
-    serialized = concept_map.dict()
-    return _replace_relationship_with_equivalence(serialized)
+    logger.info("Profiled ConceptMap %s (validate=%s): %s", lookup_code, validate, timer.summary())
+    headers = {"Server-Timing": timer.server_timing(), "Cache-Control": "no-store"}
+    if dump_result["path"] is not None:
+        headers["X-Profile-Dump"] = dump_result["path"]
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def render_concept_map(lookup_code: str, rows, date: str, validate: Optional[bool] = None) -> dict:
+    """Build a ConceptMap from fetch_concept_map_with_displays rows
+
+    ``validate`` chooses between fhir.resources model validation and the fast
+    dict emitter; it defaults to ``config.CONCEPTMAP_VALIDATE``.
+    """
+    if validate is None:
+        validate = config.CONCEPTMAP_VALIDATE
+    build = _build_concept_map_model if validate else _emit_concept_map
+    with metrics.SERIALIZATION_LATENCY.time("build_model" if validate else "emit"):
+        return build(lookup_code, rows, date)
+
+def _concept_map_from_rows(lookup_code: str, rows, validate: Optional[bool] = None) -> dict:
+    # Same date as the pre-rendered bodies, so every path returns one resource
+    return render_concept_map(lookup_code, rows, release_date(), validate)
+
+def serialize_resource(resource: dict) -> bytes:
+    """Compact UTF-8 JSON, identical to what the API sends"""
+    with metrics.SERIALIZATION_LATENCY.time("serialize"):
+        return json.dumps(
+            resource, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+def _translate_request_codes(payload) -> List[str]:
+    """Extract source codes from {"codes": [...]} or a FHIR Parameters resource"""
+    if isinstance(payload, list):
+        codes = payload
+    elif isinstance(payload, dict) and payload.get("resourceType") == "Parameters":
+        parameters = payload.get("parameter") or []
+        if not isinstance(parameters, list) or not all(isinstance(p, dict) for p in parameters):
+            raise HTTPException(status_code=400, detail="Parameters 'parameter' must be a list of objects")
+        codes = []
+        for parameter in parameters:
+            if parameter.get("name") == "code":
+                codes.append(parameter.get("valueCode") or parameter.get("valueString"))
+            elif parameter.get("name") == "coding" and isinstance(parameter.get("valueCoding"), dict):
+                codes.append(parameter["valueCoding"].get("code"))
+    elif isinstance(payload, dict):
+        codes = payload.get("codes")
+    else:
+        codes = None
+
+    if not isinstance(codes, list) or not codes:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide a non-empty 'codes' list or a Parameters resource with 'code' parameters"
+        )
+    if not all(isinstance(code, str) and code.strip() for code in codes):
+        raise HTTPException(status_code=400, detail="Every code must be a non-empty string")
+    if len(codes) > config.TRANSLATE_MAX_CODES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {config.TRANSLATE_MAX_CODES} codes can be translated per request"
+        )
+    return codes
+
+@router.post("/ConceptMap/$translate")
+async def translate_concept_maps(payload: Annotated[Any, Body()]):
+    """Translate many NAMASTE codes at once into a FHIR batch-response Bundle"""
+    codes = _translate_request_codes(payload)
+    return await _run(translate_codes, codes)
+
+def translate_codes(codes: List[str]) -> dict:
+    """Build the batch-response Bundle for already validated source codes"""
+    resolved = fetch_concept_maps_bulk(codes)
+
+    entries = []
+    for code in codes:
+        lookup_code = normalize_code(code)
+        rows = resolved.get(lookup_code)
+        if rows:
+            entries.append({
+                "resource": _concept_map_from_rows(lookup_code, rows),
+                "response": {"status": "200 OK"}
+            })
+        else:
+            entries.append({
+                "response": {
+                    "status": "404 Not Found",
+                    "outcome": {
+                        "resourceType": "OperationOutcome",
+                        "issue": [{
+                            "severity": "error",
+                            "code": "not-found",
+                            "diagnostics": f"Mapping not found for code: {lookup_code}"
+                        }]
+                    }
+                }
+            })
+
+    return {
+        "resourceType": "Bundle",
+        "type": "batch-response",
+        "total": len(entries),
+        "entry": entries
+    }
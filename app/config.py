@@ -0,0 +1,79 @@
+"""
+Runtime settings for the terminology service.
+Every value can be overridden through a ``TERMINOLOGY_``-prefixed environment
+variable, named next to each setting below (e.g. ``SNAPSHOT_MODE`` reads
+``TERMINOLOGY_SNAPSHOT``). Flags are enabled with ``1``.
+"""
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+DB_PATH = os.environ.get("TERMINOLOGY_DB_PATH", "db/ayush_icd11_combined.db")
+
+# Read-only connection pool
+DB_POOL_SIZE = _env_int("TERMINOLOGY_DB_POOL_SIZE", 8)
+DB_POOL_TIMEOUT = float(os.environ.get("TERMINOLOGY_DB_POOL_TIMEOUT", "5.0"))
+DB_MMAP_SIZE = _env_int("TERMINOLOGY_DB_MMAP_SIZE", 256 * 1024 * 1024)
+DB_CACHE_SIZE_KB = _env_int("TERMINOLOGY_DB_CACHE_SIZE_KB", 16 * 1024)
+DB_CACHED_STATEMENTS = _env_int("TERMINOLOGY_DB_CACHED_STATEMENTS", 128)
+
+# In-memory terminology snapshot (hot reloaded when the database file changes)
+SNAPSHOT_MODE = os.environ.get("TERMINOLOGY_SNAPSHOT", "0") == "1"
+SNAPSHOT_POLL_INTERVAL = float(os.environ.get("TERMINOLOGY_SNAPSHOT_POLL_INTERVAL", "2.0"))
+
+# LRU cache of rendered ConceptMap responses
+RESPONSE_CACHE_MAX_ENTRIES = _env_int("TERMINOLOGY_RESPONSE_CACHE_MAX_ENTRIES", 1024)
+RESPONSE_CACHE_MAX_BYTES = _env_int("TERMINOLOGY_RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+
+# Shared cache of CodeSystem $lookup results
+LOOKUP_CACHE_MAX_ENTRIES = _env_int("TERMINOLOGY_LOOKUP_CACHE_MAX_ENTRIES", 4096)
+LOOKUP_CACHE_MAX_BYTES = _env_int("TERMINOLOGY_LOOKUP_CACHE_MAX_BYTES", 8 * 1024 * 1024)
+
+# gzip copies kept next to cached and pre-rendered bodies; smaller bodies are
+# only sent uncompressed
+GZIP_MIN_SIZE = _env_int("TERMINOLOGY_GZIP_MIN_SIZE", 1024)
+GZIP_LEVEL = _env_int("TERMINOLOGY_GZIP_LEVEL", 6)
+
+# Build ConceptMaps through fhir.resources models (validating) instead of the
+# direct dict emitter
+CONCEPTMAP_VALIDATE = os.environ.get("TERMINOLOGY_CONCEPTMAP_VALIDATE", "0") == "1"
+
+# Upper bound on codes accepted by POST /ConceptMap/$translate
+TRANSLATE_MAX_CODES = _env_int("TERMINOLOGY_TRANSLATE_MAX_CODES", 1000)
+
+# GET /ConceptMap page sizes
+LIST_DEFAULT_COUNT = _env_int("TERMINOLOGY_LIST_DEFAULT_COUNT", 1000)
+LIST_MAX_COUNT = _env_int("TERMINOLOGY_LIST_MAX_COUNT", 5000)
+
+# ValueSet/$expand type-ahead: result sizes, and whether the prefix index is
+# built at startup rather than on the first request
+EXPAND_DEFAULT_COUNT = _env_int("TERMINOLOGY_EXPAND_DEFAULT_COUNT", 20)
+EXPAND_MAX_COUNT = _env_int("TERMINOLOGY_EXPAND_MAX_COUNT", 100)
+EXPAND_PRELOAD = os.environ.get("TERMINOLOGY_EXPAND_PRELOAD", "1") == "1"
+
+# /search page sizes and the most words taken from a search string
+SEARCH_DEFAULT_COUNT = _env_int("TERMINOLOGY_SEARCH_DEFAULT_COUNT", 20)
+SEARCH_MAX_COUNT = _env_int("TERMINOLOGY_SEARCH_MAX_COUNT", 100)
+SEARCH_MAX_TERMS = _env_int("TERMINOLOGY_SEARCH_MAX_TERMS", 16)
+
+# Prometheus /metrics endpoint and request instrumentation
+METRICS_ENABLED = os.environ.get("TERMINOLOGY_METRICS", "1") == "1"
+
+# Per-request stage profiling (?_profile=1 or X-Profile: 1) is ignored unless
+# enabled here; cProfile dumps (_profile=cprofile) are written to PROFILE_DIR
+PROFILING_ENABLED = os.environ.get("TERMINOLOGY_PROFILING", "0") == "1"
+PROFILE_DIR = os.environ.get("TERMINOLOGY_PROFILE_DIR", "output/profiles")
+
+# Startup warmup: open pooled connections, run each fetch helper once and
+# pre-render the first WARMUP_CACHE_CODES ConceptMaps into the response cache
+WARMUP = os.environ.get("TERMINOLOGY_WARMUP", "0") == "1"
+WARMUP_CACHE_CODES = _env_int("TERMINOLOGY_WARMUP_CACHE_CODES", 100)
+
+# Dedicated executor for blocking SQLite work behind the async routes.
+# Requests beyond DB_MAX_PENDING in flight are rejected with 503.
+DB_EXECUTOR_WORKERS = _env_int("TERMINOLOGY_DB_EXECUTOR_WORKERS", DB_POOL_SIZE)
+DB_MAX_PENDING = _env_int("TERMINOLOGY_DB_MAX_PENDING", 256)
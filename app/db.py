@@ -0,0 +1,279 @@
+"""
+Shared read-only SQLite connection pool for the API routes.
+
+The terminology database is only ever read by the service, so connections are
+opened once in ``mode=ro`` with tuned pragmas and handed out to the fetch
+helpers instead of calling ``sqlite3.connect`` for every query. Statements are
+prepared once per connection through sqlite3's statement cache, which works as
+long as callers keep their SQL text constant.
+
+Async routes hand their blocking work to a dedicated, bounded executor through
+``run_blocking`` so the event loop never waits on SQLite. Admission control
+rejects work beyond ``config.DB_MAX_PENDING`` instead of queueing unboundedly.
+"""
+import asyncio
+import functools
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from app import config
+
+
+def file_signature(db_path: str):
+    """(mtime_ns, size) of the database file and its WAL, if any."""
+    signature = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def database_version(signature) -> str:
+    """Short stable identifier for a database file signature."""
+    return hashlib.blake2b(repr(signature).encode(), digest_size=8).hexdigest()
+
+
+def version_date(signature) -> str:
+    """ISO date on which the database file was last written."""
+    if not signature or signature[0] is None:
+        return datetime.now().date().isoformat()
+    return datetime.fromtimestamp(signature[0][0] / 1e9).date().isoformat()
+
+
+def release_dates(conn) -> dict:
+    """ConceptMap version -> release date recorded by the render step."""
+    try:
+        return dict(conn.execute("SELECT version, date FROM concept_map_release"))
+    except sqlite3.OperationalError:
+        # Database rendered before release dates were recorded
+        return {}
+
+
+def open_readonly(db_path: str, **kwargs) -> sqlite3.Connection:
+    """Open ``db_path`` read-only with the service's tuned pragmas."""
+    uri = f"{Path(os.path.abspath(db_path)).as_uri()}?mode=ro"
+    conn = sqlite3.connect(
+        uri,
+        uri=True,
+        cached_statements=config.DB_CACHED_STATEMENTS,
+        **kwargs,
+    )
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute(f"PRAGMA mmap_size = {int(config.DB_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size = -{int(config.DB_CACHE_SIZE_KB)}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no pooled connection became free within the timeout."""
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of read-only SQLite connections."""
+
+    def __init__(self, db_path: str, max_size: int = config.DB_POOL_SIZE,
+                 timeout: float = config.DB_POOL_TIMEOUT):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+
+    def _open(self) -> sqlite3.Connection:
+        return open_readonly(self.db_path, check_same_thread=False)
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+
+        if conn is None:
+            with self._lock:
+                can_open = self._created < self.max_size
+                if can_open:
+                    self._created += 1
+            if can_open:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                with self._lock:
+                    self._waits += 1
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available after {self.timeout}s"
+                    )
+
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of the ``with`` block."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def warm(self, count: int = None) -> int:
+        """Open up to ``count`` connections ahead of traffic and load their schema."""
+        count = min(count or self.max_size, self.max_size)
+        held = []
+        try:
+            while len(held) < count:
+                conn = self._acquire()
+                held.append(conn)
+                conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        finally:
+            for conn in held:
+                self._release(conn)
+        return len(held)
+
+    def close_idle(self):
+        """Close every idle connection, e.g. after the database file changed."""
+        closed = 0
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            closed += 1
+        with self._lock:
+            self._created -= closed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "max_size": self.max_size,
+                "open": self._created,
+                "in_use": self._in_use,
+                "idle": self._created - self._in_use,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool for ``config.DB_PATH``."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(config.DB_PATH)
+    return _pool
+
+
+def connection():
+    """Shortcut for ``get_pool().connection()``."""
+    return get_pool().connection()
+
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+
+class Overloaded(RuntimeError):
+    """Raised when more than ``config.DB_MAX_PENDING`` database calls are in flight."""
+
+
+class BlockingExecutor:
+    """Bounded thread pool with explicit backpressure for database work."""
+
+    def __init__(self, max_workers: int = config.DB_EXECUTOR_WORKERS,
+                 max_pending: int = config.DB_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="db"
+                    )
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise Overloaded(f"{self._pending} database calls already in flight")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+
+executor = BlockingExecutor()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run ``func`` on the database executor and await its result."""
+    return await executor.run(func, *args, **kwargs)
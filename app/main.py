@@ -1,12 +1,59 @@
-from fastapi import FastAPI
-from app import conceptmap
+import time
+_imports_started = time.perf_counter()
+
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app import codesystem, config, conceptmap, db, metrics, search, snapshot, valueset
+from app.profiling import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# Cold-start breakdown: module imports, then each lifespan phase (see /health)
+startup = StageTimer()
+startup.stages["imports"] = time.perf_counter() - _imports_started
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.SNAPSHOT_MODE:
+        with startup.stage("snapshot"):
+            snapshot.start()
+    if config.EXPAND_PRELOAD and os.path.exists(config.DB_PATH):
+        with startup.stage("expand_index"):
+            valueset.get_index()
+    if config.WARMUP and os.path.exists(config.DB_PATH):
+        from app.warmup import warmup
+        with startup.stage("warmup"):
+            warmup(startup)
+    logger.info("Startup: %s", startup.summary())
+    yield
+    snapshot.stop()
+    db.executor.shutdown()
+
 
 app = FastAPI(
     title="Ayush ICD-11 Terminology Microservice",
     version="0.1.0",
-    description="FHIR-compliant terminology service for mapping NAMASTE Ayurveda codes to ICD-11"
+    description="FHIR-compliant terminology service for mapping NAMASTE Ayurveda codes to ICD-11",
+    lifespan=lifespan
 )
 
+if config.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(db.Overloaded)
+@app.exception_handler(db.PoolTimeout)
+async def overloaded_handler(request: Request, exc: Exception):
+    """Shed load explicitly instead of queueing database work without bound"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service overloaded, retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
 @app.get("/")
 def root():
     return {
@@ -15,9 +62,45 @@ def root():
         "endpoints": {
             "concept_maps": "/ConceptMap",
             "specific_mapping": "/ConceptMap/{code}",
+            "code_lookup": "/CodeSystem/$lookup?system={system}&code={code}",
+            "autocomplete": "/ValueSet/$expand?filter={text}",
+            "search": "/search?q={text}",
+            "health": "/health",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
 
+@app.get("/health")
+def health():
+    """Service liveness plus pool, executor, snapshot and cache statistics"""
+    return {
+        "status": "ok",
+        "database": db.pool_stats(),
+        "executor": db.executor.stats(),
+        "snapshot": snapshot.snapshot_stats(),
+        "response_cache": conceptmap.response_cache.stats(),
+        "lookup_cache": codesystem.lookup_cache.stats(),
+        "startup_ms": {name: round(seconds * 1000, 3) for name, seconds in startup.stages.items()}
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Prometheus text exposition of request, query, serialization and cache metrics"""
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    body = metrics.render(
+        database=db.pool_stats(),
+        executor=db.executor.stats(),
+        caches={
+            "response": conceptmap.response_cache.stats(),
+            "lookup": codesystem.lookup_cache.stats(),
+        },
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 # Register routers
 app.include_router(conceptmap.router, tags=["ConceptMap"])
+app.include_router(codesystem.router, tags=["CodeSystem"])
+app.include_router(valueset.router, tags=["ValueSet"])
+app.include_router(search.router, tags=["Search"])
@@ -0,0 +1,238 @@
+"""
+Lightweight Prometheus instrumentation for the terminology service.
+
+Metrics are plain counters and fixed-bucket histograms guarded by a lock, so
+recording one observation costs a bisect and a few additions. Pool, executor
+and cache figures are not tracked per request at all: they are read from the
+existing ``stats()`` helpers when ``/metrics`` is scraped.
+"""
+import bisect
+import functools
+import threading
+import time
+
+# Seconds; spans in-memory lookups (tens of microseconds) to slow requests
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    """Cumulative fixed-bucket histogram with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return series[2] if series else 0
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _labels(self.labelnames, labels, 'le="' + le + '"')
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {count}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+REQUEST_LATENCY = Histogram(
+    "terminology_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route"),
+)
+REQUESTS = Counter(
+    "terminology_http_requests_total",
+    "HTTP responses by route template and status code",
+    ("method", "route", "status"),
+)
+QUERY_LATENCY = Histogram(
+    "terminology_db_query_duration_seconds",
+    "Duration of data-access helper calls (SQLite or snapshot)",
+    ("helper",),
+)
+SERIALIZATION_LATENCY = Histogram(
+    "terminology_fhir_serialization_duration_seconds",
+    "Time spent building and serializing FHIR resources",
+    ("stage",),
+)
+
+_instruments = [REQUEST_LATENCY, REQUESTS, QUERY_LATENCY, SERIALIZATION_LATENCY]
+
+
+def timed_query(helper: str):
+    """Decorator recording every call of a fetch helper under ``helper``"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                QUERY_LATENCY.observe(time.perf_counter() - start, helper)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each request by its route template.
+
+    Labels use the matched path template (``/ConceptMap/{source_code}``)
+    rather than the raw URL, so series stay bounded under any traffic.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method, template)
+            REQUESTS.inc(method, template, str(status))
+
+
+def _gauge(name: str, documentation: str, samples, metric_type: str = "gauge"):
+    """Render a metric whose samples are computed at scrape time"""
+    yield f"# HELP {name} {documentation}"
+    yield f"# TYPE {name} {metric_type}"
+    for labels, value in samples:
+        yield f"{name}{labels} {value}"
+
+
+def render(database: dict, executor: dict, caches: dict) -> str:
+    """Prometheus text exposition of every instrument plus scrape-time stats"""
+    lines = []
+    for instrument in _instruments:
+        lines.extend(instrument.render())
+
+    lines.extend(_gauge(
+        "terminology_db_connections", "Pooled SQLite connections by state",
+        [(f'{{state="{state}"}}', database.get(state, 0)) for state in ("open", "in_use", "idle")]
+    ))
+    lines.extend(_gauge(
+        "terminology_db_pool_max_connections", "Configured connection pool size",
+        [("", database.get("max_size", 0))]
+    ))
+    lines.extend(_gauge(
+        "terminology_db_pool_events_total", "Connection pool checkouts, waits and timeouts",
+        [(f'{{event="{event}"}}', database.get(event, 0)) for event in ("checkouts", "waits", "timeouts")],
+        metric_type="counter"
+    ))
+    lines.extend(_gauge(
+        "terminology_db_executor_tasks", "Blocking database calls pending in the executor",
+        [("", executor.get("pending", 0))]
+    ))
+    lines.extend(_gauge(
+        "terminology_db_executor_events_total", "Executor calls completed and rejected",
+        [(f'{{event="{event}"}}', executor.get(event, 0)) for event in ("completed", "rejected")],
+        metric_type="counter"
+    ))
+
+    cache_samples = {"hits": [], "misses": [], "hit_ratio": [], "bytes": [], "entries": []}
+    for cache_name, stats in caches.items():
+        for field, samples in cache_samples.items():
+            samples.append((f'{{cache="{cache_name}"}}', stats.get(field, 0)))
+    lines.extend(_gauge("terminology_cache_hits_total", "Cache hits", cache_samples["hits"], "counter"))
+    lines.extend(_gauge("terminology_cache_misses_total", "Cache misses", cache_samples["misses"], "counter"))
+    lines.extend(_gauge("terminology_cache_hit_ratio", "Cache hits over lookups", cache_samples["hit_ratio"]))
+    lines.extend(_gauge("terminology_cache_bytes", "Bytes held by the cache", cache_samples["bytes"]))
+    lines.extend(_gauge("terminology_cache_entries", "Entries held by the cache", cache_samples["entries"]))
+    return "\n".join(lines) + "\n"
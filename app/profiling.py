@@ -0,0 +1,78 @@
+"""
+Opt-in per-request stage timing for diagnosing slow lookups.
+
+A request asks for profiling with ``?_profile=1`` or ``X-Profile: 1``
+(``cprofile`` additionally writes a cProfile dump). Requests are only honoured
+when ``TERMINOLOGY_PROFILING=1``; otherwise the flag is ignored.
+"""
+import cProfile
+import os
+import re
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+
+from app import config
+
+STAGES = "stages"
+CPROFILE = "cprofile"
+
+
+def requested_mode(query_flag: Optional[str], header_flag: Optional[str]) -> Optional[str]:
+    """STAGES, CPROFILE or None for the flags sent with a request"""
+    if not config.PROFILING_ENABLED:
+        return None
+    for flag in (query_flag, header_flag):
+        value = (flag or "").strip().lower()
+        if value == CPROFILE:
+            return CPROFILE
+        if value in ("1", "true", "yes", STAGES):
+            return STAGES
+    return None
+
+
+class StageTimer:
+    """Accumulates wall time per named stage, in the order stages first ran."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages.items())
+
+    def summary(self) -> str:
+        return " ".join(f"{name}={seconds * 1000:.3f}ms" for name, seconds in self.stages.items())
+
+
+def stage(timer: Optional[StageTimer], name: str):
+    """``timer.stage(name)``, or a no-op when the request is not profiled"""
+    return timer.stage(name) if timer is not None else nullcontext()
+
+
+@contextmanager
+def cprofile_dump(label: str, enabled: bool):
+    """Run the block under cProfile and yield a holder for the dump path"""
+    result = {"path": None}
+    if not enabled:
+        yield result
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_") or "request"
+        path = os.path.join(config.PROFILE_DIR, f"{safe_label}-{time.time_ns()}.prof")
+        profiler.dump_stats(path)
+        result["path"] = path
@@ -0,0 +1,189 @@
+"""
+Ranked full-text search over the nam_fts and icd11_fts FTS5 indexes.
+
+Each page is resolved in two statements per index: a keyset query that orders
+matches by bm25() rank inside SQLite and returns only (rowid, rank) for one
+page, then a snippet() query for just those rows. SQL text is fixed per index
+so pooled connections reuse their prepared statements across requests.
+"""
+import base64
+import heapq
+import json
+import math
+import re
+import sqlite3
+from typing import Annotated, List, Optional
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app import config, db
+from app.conceptmap import ICD11_SYSTEM, NAMASTE_SYSTEM
+
+router = APIRouter()
+
+# Searchable indexes in merge order (ties on rank are broken by this order)
+SEARCH_INDEXES = {
+    "nam": {"fts": "nam_fts", "system": NAMASTE_SYSTEM, "code": "namc_code", "display": "namc_term"},
+    "icd11": {"fts": "icd11_fts", "system": ICD11_SYSTEM, "code": "code", "display": "title"},
+}
+
+_MIN_ROWID = -(2 ** 63)
+_MAX_ROWID = 2 ** 63 - 1
+
+_TERM = re.compile(r"\w+\*?")
+
+
+def _rank_sql(fts: str) -> str:
+    return f"""
+        SELECT rowid, rank FROM {fts}
+        WHERE {fts} MATCH ? AND (rank > ? OR (rank = ? AND rowid > ?))
+        ORDER BY rank, rowid
+        LIMIT ?
+    """
+
+
+def _snippet_sql(fts: str, code: str, display: str) -> str:
+    return f"""
+        SELECT rowid, {code}, {display}, snippet({fts}, -1, '<mark>', '</mark>', '…', 12)
+        FROM {fts}
+        WHERE {fts} MATCH ? AND rowid IN (SELECT value FROM json_each(?))
+    """
+
+
+_STATEMENTS = {
+    name: (_rank_sql(spec["fts"]), _snippet_sql(spec["fts"], spec["code"], spec["display"]))
+    for name, spec in SEARCH_INDEXES.items()
+}
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into a safe FTS5 query: quoted terms, implicitly ANDed.
+
+    Operators, column filters and stray quotes are dropped; a trailing ``*``
+    on a word keeps prefix matching (``insom*``).
+    """
+    terms = []
+    for term in _TERM.findall(text)[:config.SEARCH_MAX_TERMS]:
+        prefix = term.endswith("*")
+        word = term.rstrip("*")
+        terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+def encode_cursor(rank: float, index_order: int, rowid: int) -> str:
+    raw = json.dumps([rank, index_order, rowid]).encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, index_order, rowid = json.loads(raw)
+        rank, index_order, rowid = float(rank), int(index_order), int(rowid)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid search cursor")
+    # SQLite binds only finite ranks and signed 64-bit integers
+    if not math.isfinite(rank) or not all(_MIN_ROWID <= n <= _MAX_ROWID for n in (index_order, rowid)):
+        raise HTTPException(status_code=400, detail="Invalid search cursor")
+    return rank, index_order, rowid
+
+
+def _keyset_params(index_order: int, cursor):
+    """(rank, rank, rowid) bounds for one index so rows follow the cursor"""
+    if cursor is None:
+        return float("-inf"), float("-inf"), _MIN_ROWID
+    rank, cursor_order, rowid = cursor
+    if index_order < cursor_order:
+        after = _MAX_ROWID
+    elif index_order > cursor_order:
+        after = _MIN_ROWID
+    else:
+        after = rowid
+    return rank, rank, after
+
+
+def search(text: str, indexes: List[str], count: int, cursor=None) -> dict:
+    """One page of ranked matches across ``indexes``, plus the next cursor"""
+    match = fts_query(text)
+    if not match:
+        raise HTTPException(status_code=400, detail="Search text must contain at least one word")
+
+    order = {name: position for position, name in enumerate(SEARCH_INDEXES)}
+    try:
+        with db.connection() as conn:
+            ranked = []
+            for name in indexes:
+                rank_sql, _ = _STATEMENTS[name]
+                bounds = _keyset_params(order[name], cursor)
+                rows = conn.execute(rank_sql, (match, *bounds, count + 1)).fetchall()
+                ranked.append([(rank, order[name], rowid, name) for rowid, rank in rows])
+            page = list(heapq.merge(*ranked))[:count + 1]
+            has_next = len(page) > count
+            page = page[:count]
+
+            details = {}
+            for name in indexes:
+                rowids = [rowid for _, _, rowid, index in page if index == name]
+                if rowids:
+                    _, snippet_sql = _STATEMENTS[name]
+                    for rowid, code, display, snippet in conn.execute(snippet_sql, (match, json.dumps(rowids))):
+                        details[(name, rowid)] = (code, display, snippet)
+    except sqlite3.OperationalError as e:
+        if "fts5" in str(e):
+            raise HTTPException(status_code=400, detail=f"Invalid search query: {e}")
+        raise
+
+    results = []
+    for rank, _, rowid, name in page:
+        code, display, snippet = details[(name, rowid)]
+        results.append({
+            "index": name,
+            "system": SEARCH_INDEXES[name]["system"],
+            "code": code,
+            "display": display,
+            "snippet": snippet,
+            # bm25() is lower-is-better; flip it so clients sort descending
+            "score": round(-rank, 6),
+        })
+
+    next_cursor = encode_cursor(*page[-1][:3]) if has_next else None
+    return {"query": match, "results": results, "next_cursor": next_cursor}
+
+
+def _search_url(q: str, index: Optional[str], count: int, cursor: Optional[str] = None) -> str:
+    params = {"q": q, "_count": count}
+    if index is not None:
+        params["index"] = index
+    if cursor is not None:
+        params["cursor"] = cursor
+    return f"/search?{urlencode(params)}"
+
+
+@router.get("/search")
+async def read_search(
+    q: Annotated[str, Query(min_length=1)],
+    index: Annotated[Optional[str], Query()] = None,
+    count: Annotated[Optional[int], Query(alias="_count", ge=1)] = None,
+    cursor: Annotated[Optional[str], Query()] = None
+):
+    """Full-text search over NAMASTE and ICD-11 terms, ranked by bm25()
+
+    ``index`` restricts the search to ``nam`` or ``icd11``; ``cursor`` continues
+    after the last result of the previous page.
+    """
+    if index is not None and index not in SEARCH_INDEXES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown search index: {index}. Supported: {', '.join(SEARCH_INDEXES)}"
+        )
+    count = min(count or config.SEARCH_DEFAULT_COUNT, config.SEARCH_MAX_COUNT)
+    indexes = [index] if index is not None else list(SEARCH_INDEXES)
+    after = decode_cursor(cursor) if cursor is not None else None
+
+    page = await db.run_blocking(search, q, indexes, count, after)
+
+    links = [{"relation": "self", "url": _search_url(q, index, count, cursor)}]
+    if page["next_cursor"] is not None:
+        links.append({"relation": "next", "url": _search_url(q, index, count, page["next_cursor"])})
+    return {"query": page["query"], "link": links, "results": page["results"]}
@@ -0,0 +1,174 @@
+"""
+Optional in-memory terminology snapshot with hot reload.
+
+The mapping data is small and read-only, so when ``TERMINOLOGY_SNAPSHOT=1`` the
+service loads ``concept_map``, ``nam`` and ``icd11`` once into dict indexes and
+answers lookups without touching SQLite. A background thread polls the database
+file and atomically swaps in a rebuilt snapshot when it changes.
+"""
+import logging
+import sqlite3
+import sys
+import threading
+import time
+
+from app import config, db
+from app.codes import code_key, matches_source_code, normalize_code
+from app.db import file_signature
+
+logger = logging.getLogger(__name__)
+
+
+class TerminologySnapshot:
+    """Immutable in-memory copy of the tables the API reads."""
+
+    __slots__ = ("signature", "release_dates", "loaded_at", "row_count", "_by_key", "_by_target",
+                 "_source_codes", "_nam_terms", "_icd11_titles")
+
+    def __init__(self, signature, mappings, nam_terms, icd11_titles, release_dates=None):
+        self.signature = signature
+        self.release_dates = release_dates or {}
+        self.loaded_at = time.time()
+        self.row_count = len(mappings)
+        self._nam_terms = nam_terms
+        self._icd11_titles = icd11_titles
+
+        # Mapping records share the shape of fetch_concept_map_with_displays:
+        # (source_code, target_code, equivalence, namaste_term, icd11_title)
+        by_key = {}
+        by_target = {}
+        for source_code, target_code, equivalence in mappings:
+            record = (
+                source_code,
+                target_code,
+                equivalence,
+                nam_terms.get(source_code),
+                icd11_titles.get(target_code),
+            )
+            by_key.setdefault(code_key(source_code), []).append(record)
+            by_target.setdefault(target_code, []).append(record)
+        self._by_key = {key: tuple(records) for key, records in by_key.items()}
+        self._by_target = {code: tuple(records) for code, records in by_target.items()}
+        self._source_codes = tuple(sorted({m[0] for m in mappings}))
+
+    @classmethod
+    def load(cls, db_path: str) -> "TerminologySnapshot":
+        signature = file_signature(db_path)
+        conn = db.open_readonly(db_path)
+        try:
+            mappings = [
+                (sys.intern(normalize_code(source)), sys.intern(target), sys.intern(equivalence))
+                for source, target, equivalence in conn.execute(
+                    "SELECT source_code, target_code, equivalence FROM concept_map ORDER BY id"
+                )
+            ]
+            # Keep the first row per code, matching the LIMIT 1 lookups
+            nam_terms = {}
+            for code, term in conn.execute("SELECT namc_code, namc_term FROM nam ORDER BY rowid"):
+                if code is not None:
+                    nam_terms.setdefault(sys.intern(code), term)
+            icd11_titles = {}
+            for code, title in conn.execute("SELECT code, title FROM icd11 ORDER BY rowid"):
+                if code is not None:
+                    icd11_titles.setdefault(sys.intern(code), title)
+            release_dates = db.release_dates(conn)
+        finally:
+            conn.close()
+        return cls(signature, mappings, nam_terms, icd11_titles, release_dates)
+
+    def concept_map(self, source_code: str):
+        source_code = normalize_code(source_code)
+        return [
+            record for record in self._by_key.get(code_key(source_code), ())
+            if matches_source_code(record[0], source_code)
+        ]
+
+    def reverse_concept_map(self, target_code: str):
+        return list(self._by_target.get(normalize_code(target_code), ()))
+
+    def namaste_term(self, namc_code: str):
+        return self._nam_terms.get(namc_code)
+
+    def icd11_title(self, icd_code: str):
+        return self._icd11_titles.get(icd_code)
+
+    def source_codes(self):
+        return self._source_codes
+
+    def stats(self) -> dict:
+        return {
+            "mappings": self.row_count,
+            "source_codes": len(self._source_codes),
+            "nam_terms": len(self._nam_terms),
+            "icd11_titles": len(self._icd11_titles),
+            "loaded_at": self.loaded_at,
+        }
+
+
+_current = None
+_reloads = 0
+_watcher = None
+_stop = threading.Event()
+
+
+def current():
+    """The active snapshot, or None when the service reads from SQLite."""
+    return _current
+
+
+def reload(db_path: str = None) -> TerminologySnapshot:
+    """Build a fresh snapshot and swap it in atomically."""
+    global _current, _reloads
+    snapshot = TerminologySnapshot.load(db_path or config.DB_PATH)
+    _current = snapshot
+    _reloads += 1
+    # Pooled connections may still point at a replaced database file
+    db.get_pool().close_idle()
+    return snapshot
+
+
+def _watch(db_path: str, interval: float):
+    while not _stop.wait(interval):
+        snapshot = _current
+        signature = file_signature(db_path)
+        if snapshot is None or signature == snapshot.signature:
+            continue
+        try:
+            reload(db_path)
+            logger.info("Reloaded terminology snapshot from %s", db_path)
+        except sqlite3.Error as e:
+            # The database may be mid-rebuild; keep serving the old snapshot
+            logger.warning("Snapshot reload failed, keeping previous snapshot: %s", e)
+        except Exception:
+            # Never let bad data end the watcher; the next change retries
+            logger.exception("Snapshot reload failed, keeping previous snapshot")
+
+
+def start(db_path: str = None, interval: float = config.SNAPSHOT_POLL_INTERVAL):
+    """Load the snapshot and start watching the database file for changes."""
+    global _watcher
+    db_path = db_path or config.DB_PATH
+    reload(db_path)
+    if interval > 0 and _watcher is None:
+        _stop.clear()
+        _watcher = threading.Thread(
+            target=_watch, args=(db_path, interval), name="snapshot-watcher", daemon=True
+        )
+        _watcher.start()
+
+
+def stop():
+    """Stop the watcher and fall back to SQLite lookups."""
+    global _current, _watcher
+    _stop.set()
+    if _watcher is not None:
+        _watcher.join()
+        _watcher = None
+    _current = None
+
+
+def snapshot_stats() -> dict:
+    snapshot = _current
+    if snapshot is None:
+        return {"enabled": False}
+    return {"enabled": True, "reloads": _reloads, **snapshot.stats()}
@@ -0,0 +1,194 @@
+"""
+Type-ahead ValueSet/$expand backed by an in-memory sorted-array prefix index.
+
+NAMASTE codes, terms and English names plus ICD-11 codes and titles are
+normalized into sorted keys once (at startup, and again whenever the database
+changes). A filter is answered with binary searches over that array, so
+type-ahead traffic never reaches SQLite.
+"""
+import bisect
+import re
+import threading
+import unicodedata
+from datetime import datetime, timezone
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app import config, db
+from app.conceptmap import ICD11_SYSTEM, NAMASTE_SYSTEM
+
+router = APIRouter()
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+# Match kinds, best first
+_EXACT_CODE, _CODE_PREFIX, _DISPLAY_PREFIX, _WORD_PREFIX = range(4)
+
+
+def normalize_text(value: str) -> str:
+    """Lower-case, strip diacritics (vāta -> vata) and collapse whitespace"""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.lower().split())
+
+
+def _tokens(normalized: str):
+    return [token for token in _TOKEN_SPLIT.split(normalized) if token]
+
+
+class CompletionIndex:
+    """Sorted (key, kind, entry) arrays supporting prefix range scans."""
+
+    __slots__ = ("signature", "entries", "_keys", "_postings", "_entry_tokens")
+
+    def __init__(self, signature, entries):
+        self.signature = signature
+        # entries: (system, code, display, *aliases) tuples; aliases are
+        # searchable but never returned
+        self.entries = entries
+        pairs = []
+        entry_tokens = []
+        for entry_id, (system, code, display, *aliases) in enumerate(entries):
+            code_key = normalize_text(code)
+            pairs.append((code_key, _CODE_PREFIX, entry_id))
+            tokens = set(_tokens(code_key))
+            for text in (display, *aliases):
+                if not text:
+                    continue
+                text_key = normalize_text(text)
+                pairs.append((text_key, _DISPLAY_PREFIX, entry_id))
+                for token in _tokens(text_key):
+                    tokens.add(token)
+                    pairs.append((token, _WORD_PREFIX, entry_id))
+            entry_tokens.append(frozenset(tokens))
+        pairs.sort()
+        self._keys = [key for key, _, _ in pairs]
+        self._postings = [(kind, entry_id) for _, kind, entry_id in pairs]
+        self._entry_tokens = entry_tokens
+
+    @classmethod
+    def load(cls, db_path: str) -> "CompletionIndex":
+        signature = db.file_signature(db_path)
+        conn = db.open_readonly(db_path)
+        try:
+            entries = []
+            nam_columns = [row[1] for row in conn.execute("PRAGMA table_info(nam)")]
+            english = "name_english" if "name_english" in nam_columns else "NULL"
+            seen = set()
+            for code, term, name_english in conn.execute(
+                f"SELECT namc_code, namc_term, {english} FROM nam ORDER BY rowid"
+            ):
+                if code and code not in seen:
+                    seen.add(code)
+                    entries.append((NAMASTE_SYSTEM, code, term or "", name_english or ""))
+            seen = set()
+            for code, title in conn.execute("SELECT code, title FROM icd11 ORDER BY rowid"):
+                if code and code not in seen:
+                    seen.add(code)
+                    entries.append((ICD11_SYSTEM, code, title or ""))
+        finally:
+            conn.close()
+        return cls(signature, entries)
+
+    def _scan(self, prefix: str):
+        """Yield (kind, entry_id) for every key starting with ``prefix``"""
+        start = bisect.bisect_left(self._keys, prefix)
+        for i in range(start, len(self._keys)):
+            if not self._keys[i].startswith(prefix):
+                break
+            yield self._postings[i]
+
+    def complete(self, text: str, limit: int, system: Optional[str] = None):
+        """Top ``limit`` entries matching ``text``, best ranked first"""
+        query = normalize_text(text)
+        if not query:
+            return []
+        query_tokens = _tokens(query)
+
+        best = {}
+        for kind, entry_id in self._scan(query):
+            if kind == _CODE_PREFIX and self._keys_equal_code(entry_id, query):
+                kind = _EXACT_CODE
+            if kind < best.get(entry_id, _WORD_PREFIX + 1):
+                best[entry_id] = kind
+
+        # Multi-word filters: every word must prefix one of the entry's words
+        if len(query_tokens) > 1:
+            anchor = max(query_tokens, key=len)
+            for kind, entry_id in self._scan(anchor):
+                if entry_id in best:
+                    continue
+                tokens = self._entry_tokens[entry_id]
+                if all(any(t.startswith(q) for t in tokens) for q in query_tokens):
+                    best[entry_id] = _WORD_PREFIX
+
+        ranked = []
+        for entry_id, kind in best.items():
+            entry_system, code, display = self.entries[entry_id][:3]
+            if system is not None and entry_system != system:
+                continue
+            ranked.append(((kind, len(display), display, code), entry_id))
+        ranked.sort()
+        return [self.entries[entry_id][:3] for _, entry_id in ranked[:limit]]
+
+    def _keys_equal_code(self, entry_id: int, query: str) -> bool:
+        return normalize_text(self.entries[entry_id][1]) == query
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> CompletionIndex:
+    """Current index, rebuilt when the database file has changed"""
+    global _index
+    signature = db.file_signature(config.DB_PATH)
+    if _index is None or _index.signature != signature:
+        with _index_lock:
+            if _index is None or _index.signature != signature:
+                _index = CompletionIndex.load(config.DB_PATH)
+    return _index
+
+
+def index_ready() -> bool:
+    index = _index
+    return index is not None and index.signature == db.file_signature(config.DB_PATH)
+
+
+def expand(text: str, count: int, system: Optional[str] = None) -> dict:
+    """FHIR ValueSet with an expansion of the top ``count`` completions"""
+    matches = get_index().complete(text, count, system)
+    contains = [
+        {"system": entry_system, "code": code, "display": display}
+        for entry_system, code, display in matches
+    ]
+    parameters = [{"name": "filter", "valueString": text}, {"name": "count", "valueInteger": count}]
+    if system is not None:
+        parameters.append({"name": "system", "valueUri": system})
+    return {
+        "resourceType": "ValueSet",
+        "status": "active",
+        "expansion": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "total": len(contains),
+            "parameter": parameters,
+            "contains": contains
+        }
+    }
+
+
+@router.get("/ValueSet/$expand")
+async def read_valueset_expansion(
+    filter: Annotated[str, Query(min_length=1)],
+    count: Annotated[Optional[int], Query(ge=1)] = None,
+    system: Annotated[Optional[str], Query()] = None
+):
+    """Type-ahead completions over NAMASTE and ICD-11 codes and terms"""
+    if system is not None and system not in (NAMASTE_SYSTEM, ICD11_SYSTEM):
+        raise HTTPException(status_code=400, detail=f"Unknown code system: {system}")
+    count = min(count or config.EXPAND_DEFAULT_COUNT, config.EXPAND_MAX_COUNT)
+    if index_ready():
+        return expand(filter, count, system)
+    # First request after a database change rebuilds the index off the event loop
+    return await db.run_blocking(expand, filter, count, system)
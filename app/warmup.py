@@ -0,0 +1,47 @@
+"""
+Optional startup warmup so the first requests do not pay cold-start costs.
+
+Opens the pooled connections, runs every fetch helper once (schema checks,
+prepared statements, SQLite page cache), imports the FHIR models when the
+validating path is on, and pre-renders the most commonly listed ConceptMaps
+into the response cache.
+"""
+import logging
+
+from app import config, conceptmap, db
+from app.profiling import StageTimer
+
+logger = logging.getLogger(__name__)
+
+
+def warmup(timer: StageTimer, cache_codes: int = None) -> dict:
+    """Run each warmup stage, recording its duration as ``warmup.<stage>``"""
+    cache_codes = config.WARMUP_CACHE_CODES if cache_codes is None else cache_codes
+    summary = {}
+
+    with timer.stage("warmup.connections"):
+        summary["connections"] = db.get_pool().warm()
+
+    with timer.stage("warmup.statements"):
+        codes = conceptmap.fetch_source_codes_page(None, max(cache_codes, 1))
+        conceptmap.count_source_codes()
+        if codes:
+            sample = codes[0]
+            rows = conceptmap.fetch_concept_map_with_displays(sample)
+            conceptmap.fetch_concept_map(sample)
+            conceptmap.fetch_concept_maps_bulk([sample])
+            conceptmap.fetch_rendered_concept_map(sample)
+            conceptmap.fetch_namaste_term(sample)
+            if rows:
+                conceptmap.fetch_reverse_concept_map(rows[0][1])
+                conceptmap.fetch_icd11_title(rows[0][1])
+
+    if config.CONCEPTMAP_VALIDATE:
+        with timer.stage("warmup.fhir_models"):
+            import fhir.resources.conceptmap  # noqa: F401
+
+    with timer.stage("warmup.response_cache"):
+        summary["cached_concept_maps"] = conceptmap.prime_response_cache(codes[:cache_codes])
+
+    logger.info("Warmup complete: %s", summary)
+    return summary
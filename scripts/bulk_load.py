@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Bulk-load profile shared by the database setup scripts.
+
+Inside ``bulk_session`` every connection opened through ``connect`` trades
+durability for speed: no rollback journal, no fsyncs, a large page cache and
+in-memory temp tables. Scripts also defer secondary indexes and FTS content
+until their data is in (see ``deferring_indexes``). When the session ends the
+database is switched back to safe settings, FTS segments are merged and its
+statistics are refreshed with ``ANALYZE`` and ``PRAGMA optimize``.
+
+A bulk load that fails part way leaves the database unusable; rerun
+``scripts/init.py`` to rebuild it from the CSVs.
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from fts_maintenance import fts_tables
+
+DB_PATH = "db/ayush_icd11_combined.db"
+
+# Per-connection settings while loading. journal_mode=OFF rather than WAL keeps
+# the finished file openable by the API's read-only connections.
+BULK_PRAGMAS = (
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA cache_size = -262144",  # 256 MiB
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Settings left on the database once loading is done
+SAFE_PRAGMAS = (
+    "PRAGMA journal_mode = DELETE",
+    "PRAGMA synchronous = FULL",
+)
+
+_active = False
+
+
+def deferring_indexes() -> bool:
+    """True inside a bulk session: build indexes and FTS content after the data"""
+    return _active
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """``sqlite3.connect`` with the bulk pragmas applied inside a bulk session"""
+    conn = sqlite3.connect(db_path)
+    if _active:
+        for pragma in BULK_PRAGMAS:
+            conn.execute(pragma)
+    return conn
+
+
+def finalize(db_path: str = DB_PATH):
+    """Restore safe settings, merge FTS segments and refresh planner statistics"""
+    conn = sqlite3.connect(db_path)
+    try:
+        for pragma in SAFE_PRAGMAS:
+            conn.execute(pragma)
+        for name in fts_tables(conn):
+            conn.execute(f"INSERT INTO {name}({name}) VALUES ('optimize')")
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@contextmanager
+def bulk_session(db_path: str = DB_PATH, finalize_on_exit: bool = True):
+    """Run the enclosed setup steps under the bulk-load profile
+
+    Throwaway databases, such as parallel staging files, pass
+    ``finalize_on_exit=False`` to skip restoring settings and ``ANALYZE``.
+    """
+    global _active
+    previous, _active = _active, True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _active = previous
+    if not finalize_on_exit:
+        return
+    print(f"Bulk load finished in {time.perf_counter() - started:.2f}s; restoring safe settings...")
+    finalize(db_path)
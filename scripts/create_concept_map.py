@@ -1,6 +1,15 @@
+import os
 import sqlite3
+import sys
 from typing import List, Tuple
 
+import bulk_load
+
+# source_key must equal the key the API computes for incoming codes
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.codes import code_key
+
 
 def _normalize_code_text(value: str) -> str:
     """Collapse whitespace (including NBSP) to single ASCII spaces."""
@@ -13,7 +22,7 @@ def _normalize_code_text(value: str) -> str:
 DB_PATH = "db/ayush_icd11_combined.db"
 
 def create_concept_map_table(db_path: str = DB_PATH):
-    conn = sqlite3.connect(db_path)
+    conn = bulk_load.connect(db_path)
     cur = conn.cursor()
 
     cur.execute("""
@@ -23,54 +32,96 @@ def create_concept_map_table(db_path: str = DB_PATH):
         source_code TEXT NOT NULL,
         target_system TEXT NOT NULL,
         target_code TEXT NOT NULL,
-        equivalence TEXT DEFAULT 'equivalent'
+        equivalence TEXT DEFAULT 'equivalent',
+        source_key TEXT
     )
     """)
+
+    # Databases created before source_key existed get the column added in place
+    cur.execute("PRAGMA table_info(concept_map)")
+    if "source_key" not in [row[1] for row in cur.fetchall()]:
+        cur.execute("ALTER TABLE concept_map ADD COLUMN source_key TEXT")
+
+    create_concept_map_indexes(cur)
     conn.commit()
     conn.close()
 
+# Indexes behind the API's lookups. A bulk load drops them while the mappings
+# are generated and rebuilds them afterwards.
+_LOOKUP_INDEXES = {
+    # Ordered source codes for keyset pagination of the ConceptMap listing
+    "idx_concept_map_source_code": "concept_map (source_code)",
+    # Every code variant resolves through one equality lookup
+    "idx_concept_map_source_key": "concept_map (source_key, source_code, target_code, equivalence)",
+    # Reverse (ICD-11 -> NAMASTE) translation
+    "idx_concept_map_target_code": "concept_map (target_code, source_code, equivalence)",
+}
+
+def create_concept_map_indexes(cur):
+    for name, definition in _LOOKUP_INDEXES.items():
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+
 def create_precise_mappings(db_path: str = DB_PATH):
-    """Create precise 1-to-1 mappings using code matching and English titles with FTS indexes"""
-    conn = sqlite3.connect(db_path)
+    """Create precise 1-to-1 mappings using code indexes for code matches and FTS for English terms"""
+    conn = bulk_load.connect(db_path)
     cur = conn.cursor()
 
+    deferred = bulk_load.deferring_indexes()
+    if deferred:
+        for name in _LOOKUP_INDEXES:
+            cur.execute(f"DROP INDEX IF EXISTS {name}")
+
     # Clear existing mappings to prevent duplicates
     print("Clearing existing concept mappings...")
     cur.execute("DELETE FROM concept_map")
+
+    # Pre-rendered ConceptMaps and their release date are stale once the mappings change
+    for table in ("concept_map_rendered", "concept_map_release"):
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
+        if cur.fetchone():
+            cur.execute(f"DELETE FROM {table}")
     
-    print("Creating precise NAMASTE to ICD-11 mappings using FTS indexes...")
+    print("Creating precise NAMASTE to ICD-11 mappings using code and FTS indexes...")
     
-    # Strategy 1: Exact code matches using FTS indexes (fastest and most reliable)
-    print("Step 1: Finding exact code matches using FTS indexes...")
+    # Strategy 1: Exact code matches. The FTS tables share their rows with the
+    # base tables, so equality joins go through the B-tree code indexes instead
+    # of scanning one virtual table per row of the other. Rows are inserted in
+    # the order a nested scan of nam and icd11 would produce them.
+    print("Step 1: Finding exact code matches using code indexes...")
     cur.execute("""
     INSERT INTO concept_map (source_system, source_code, target_system, target_code, equivalence)
-    SELECT DISTINCT 'NAMASTE', n.namc_code, 'ICD-11 TM2', i.code, 'equivalent'
-    FROM nam_fts n
-    JOIN icd11_fts i ON n.namc_code = i.code
+    SELECT 'NAMASTE', n.namc_code, 'ICD-11 TM2', i.code, 'equivalent'
+    FROM nam n
+    JOIN icd11 i ON n.namc_code = i.code
     WHERE n.namc_code IS NOT NULL 
       AND i.code IS NOT NULL
       AND i.code != ''
+    GROUP BY n.namc_code, i.code
+    ORDER BY min(n.rowid), min(i.rowid)
     """)
     exact_code_matches = cur.rowcount
     
-    # Strategy 2: Code matching before brackets using FTS indexes
-    print("Step 2: Finding code matches before brackets using FTS indexes...")
+    # Strategy 2: Code matching before brackets, against trimmed ICD-11 codes
+    # materialized once so SQLite can index them
+    print("Step 2: Finding code matches before brackets using code indexes...")
     cur.execute("""
+    WITH icd11_codes AS MATERIALIZED (
+        SELECT rowid AS icd11_rowid, code, TRIM(code) AS trimmed_code
+        FROM icd11
+        WHERE code IS NOT NULL AND code != ''
+    )
     INSERT INTO concept_map (source_system, source_code, target_system, target_code, equivalence)
-    SELECT DISTINCT 'NAMASTE', n.namc_code, 'ICD-11 TM2', i.code, 'equivalent'
-    FROM nam_fts n
-    JOIN icd11_fts i ON TRIM(SUBSTR(n.namc_code, 1, CASE 
-        WHEN INSTR(n.namc_code, ' (') > 0 THEN INSTR(n.namc_code, ' (') - 1
-        ELSE LENGTH(n.namc_code)
-    END)) = TRIM(i.code)
+    SELECT 'NAMASTE', n.namc_code, 'ICD-11 TM2', i.code, 'equivalent'
+    FROM nam n
+    JOIN icd11_codes i ON i.trimmed_code = TRIM(SUBSTR(n.namc_code, 1, INSTR(n.namc_code, ' (') - 1))
     WHERE n.namc_code IS NOT NULL 
-      AND i.code IS NOT NULL
-      AND i.code != ''
       AND INSTR(n.namc_code, ' (') > 0
       AND NOT EXISTS (
         SELECT 1 FROM concept_map cm 
         WHERE cm.source_code = n.namc_code AND cm.target_code = i.code
     )
+    GROUP BY n.namc_code, i.code
+    ORDER BY min(n.rowid), min(i.icd11_rowid)
     """)
     bracket_code_matches = cur.rowcount
     
@@ -160,6 +211,15 @@ def create_precise_mappings(db_path: str = DB_PATH):
             updated_rows += 1
     if updated_rows:
         print(f"  - Normalized whitespace on {updated_rows} rows")
+
+    # Fill the canonical lookup key used by the API's indexed source_code lookups
+    print("Computing canonical source code keys...")
+    conn.create_function("source_code_key", 1, code_key, deterministic=True)
+    cur.execute("UPDATE concept_map SET source_key = source_code_key(source_code)")
+
+    if deferred:
+        print("Building concept_map lookup indexes...")
+        create_concept_map_indexes(cur)
     
     # Get final counts
     cur.execute("SELECT COUNT(*) FROM concept_map WHERE equivalence = 'equivalent'")
@@ -170,14 +230,14 @@ def create_precise_mappings(db_path: str = DB_PATH):
     
     total_mappings = equivalent_count + related_count
     
-    print(f"  - Exact code matches (FTS): {exact_code_matches}")
-    print(f"  - Code matches before brackets (FTS): {bracket_code_matches}")
+    print(f"  - Exact code matches (code index): {exact_code_matches}")
+    print(f"  - Code matches before brackets (code index): {bracket_code_matches}")
     print(f"  - Simple FTS word matches: {fts_simple_matches}")
     print(f"  - Direct English matches: {direct_english_matches}")
     print(f"  - Partial English matches: {partial_english_matches}")
     print(f"  - Total equivalent mappings: {equivalent_count}")
     print(f"  - Total related mappings: {related_count}")
-    print(f"Created {total_mappings} total concept mappings using FTS indexes.")
+    print(f"Created {total_mappings} total concept mappings.")
     
     conn.commit()
     conn.close()
@@ -1,11 +1,20 @@
 import pandas as pd
+import hashlib
 import sqlite3
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import bulk_load
+
+# Rows read from a CSV per chunk during import
+CHUNK_SIZE = 5000
 
 def create_connection(db_file):
     """Create a database connection to the SQLite database specified by db_file."""
     try:
-        conn = sqlite3.connect(db_file)
+        conn = bulk_load.connect(db_file)
         print(f"Connected to {db_file}")
         return conn
     except sqlite3.Error as e:
@@ -22,14 +31,114 @@ def table_exists(cursor, table_name):
     )
     return cursor.fetchone() is not None
 
+def _read_csv_chunks(csv_path, chunksize):
+    """CSV chunks with every value kept as the text in the file
+
+    Inferring types per chunk would turn a code such as 0000 into 0 in any
+    chunk that happens to look numeric. Numeric columns are converted by the
+    column affinity of the table instead (see ``_csv_column_types``).
+    """
+    return pd.read_csv(csv_path, chunksize=chunksize, dtype=str)
+
+def _csv_column_types(csv_path, chunksize, text_columns=()):
+    """SQLite type of each CSV column, judged over every chunk of the file
+
+    A column is INTEGER or REAL only if all of its values parse as numbers,
+    as with a whole-file read, so the result does not depend on the chunk
+    size. ``text_columns``, the lookup codes, are always TEXT so zero-padded
+    codes keep their padding.
+    """
+    types = {}
+    for chunk in _read_csv_chunks(csv_path, chunksize):
+        chunk.columns = clean_column_names(chunk.columns)
+        for column in chunk.columns:
+            if types.get(column) == "TEXT":
+                continue
+            try:
+                values = pd.to_numeric(chunk[column])
+            except (ValueError, TypeError):
+                types[column] = "TEXT"
+                continue
+            if types.get(column) != "REAL":
+                types[column] = "INTEGER" if pd.api.types.is_integer_dtype(values) else "REAL"
+    for column in text_columns:
+        if column in types:
+            types[column] = "TEXT"
+    return types
+
+def _table_schema(table_name, column_types):
+    """CREATE TABLE for ``table_name`` with the given column types"""
+    return pd.io.sql.get_schema(pd.DataFrame(columns=list(column_types)), table_name, dtype=column_types)
+
+def _chunk_rows(df):
+    """Rows of a DataFrame chunk as plain Python values, NaN as NULL"""
+    return df.astype(object).where(pd.notna(df), None).itertuples(index=False, name=None)
+
+def file_sha256(path):
+    """Hex SHA-256 of a source file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _recorded_hash(cursor, table_name):
+    """Hash of the file last imported into ``table_name``, or None"""
+    if not table_exists(cursor, "ingest_state"):
+        return None
+    row = cursor.execute("SELECT source_sha256 FROM ingest_state WHERE table_name = ?", (table_name,)).fetchone()
+    return row[0] if row else None
+
+def _import_is_current(cursor, table_name, fts_table_name, source_hash):
+    return (
+        table_exists(cursor, table_name)
+        and (not fts_table_name or table_exists(cursor, fts_table_name))
+        and _recorded_hash(cursor, table_name) == source_hash
+    )
+
+def _record_ingest(cursor, table_name, csv_path, source_hash):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_state (
+            table_name TEXT PRIMARY KEY,
+            source_path TEXT NOT NULL,
+            source_sha256 TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            ingested_at TEXT NOT NULL
+        )
+    """)
+    row_count = cursor.execute(f'SELECT count(*) FROM "{table_name}"').fetchone()[0]
+    cursor.execute(
+        "INSERT OR REPLACE INTO ingest_state VALUES (?, ?, ?, ?, ?)",
+        (table_name, csv_path, source_hash, row_count, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+    )
+
 def index_csv_to_sqlite(
     csv_path,
     db_path,
     table_name,
     fts_table_name=None,
-    fts_columns=None
+    fts_columns=None,
+    index_columns=None,
+    chunksize=CHUNK_SIZE,
+    key_column=None
 ):
-    """General-purpose function to index a CSV into SQLite with optional FTS5."""
+    """General-purpose function to index a CSV into SQLite with optional FTS5.
+
+    The CSV is streamed in chunks of ``chunksize`` rows, so memory stays
+    bounded regardless of file size. Each chunk is written with executemany
+    and the whole import is one transaction. The FTS table gets insert,
+    update and delete triggers, so it follows every later write to the base
+    table. Inside a bulk-load session the FTS index is built once, after all
+    chunks are in, and the triggers are added then.
+
+    Re-imports are incremental. A file whose SHA-256 matches the last import
+    is skipped. Otherwise an existing table is diffed against the CSV by
+    ``key_column`` (the first index column by default) and only inserted,
+    changed and removed rows are written, with the FTS index updated in the
+    same transaction.
+
+    index_columns lists key columns that get a B-tree index for point lookups.
+    """
     
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV not found: {csv_path}")
@@ -37,44 +146,329 @@ def index_csv_to_sqlite(
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
     print(f"Importing {csv_path} into {db_path}...")
-
-    df = pd.read_csv(csv_path)
-    df.columns = clean_column_names(df.columns)
+    source_hash = file_sha256(csv_path)
+    key_column = key_column or (index_columns[0] if index_columns else None)
 
     conn = create_connection(db_path)
     if not conn:
         return
     cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        if _import_is_current(cursor, table_name, fts_table_name, source_hash):
+            print(f"'{csv_path}' is unchanged since the last import. Skipping.")
+            conn.rollback()
+            return
 
-    # Create main table if not exists, else append data
-    if table_exists(cursor, table_name):
-        print(f"Table '{table_name}' exists. Appending data...")
-        df.to_sql(table_name, conn, if_exists="append", index=False)
-    else:
-        print(f"Creating table '{table_name}' and importing data...")
-        df.to_sql(table_name, conn, if_exists="replace", index=False)
-
-    # Optional FTS5 indexing
-    if fts_columns and fts_table_name:
-        if table_exists(cursor, fts_table_name):
-            print(f"FTS5 virtual table '{fts_table_name}' already exists. Skipping creation.")
+        if table_exists(cursor, table_name) and key_column:
+            _apply_csv_diff(cursor, csv_path, table_name, key_column, fts_table_name, fts_columns, chunksize,
+                            index_columns or ())
         else:
-            print(f"Creating FTS5 virtual table '{fts_table_name}' on columns: {fts_columns}")
-            columns_sql = ", ".join(fts_columns)
-            cursor.execute(f"""
-                CREATE VIRTUAL TABLE {fts_table_name} USING fts5(
-                    {columns_sql},
-                    content='{table_name}',
-                    content_rowid='rowid'
-                )
-            """)
-            columns_select = ", ".join(fts_columns)
-            cursor.execute(f"""
-                INSERT INTO {fts_table_name}({columns_select})
-                SELECT {columns_select} FROM {table_name}
-            """)
-            print(f"FTS5 index '{fts_table_name}' created and populated.")
-
-    conn.commit()
-    conn.close()
+            rows_imported = _stream_csv(cursor, csv_path, table_name, fts_table_name, fts_columns, chunksize,
+                                        index_columns or ())
+            print(f"Imported {rows_imported:,} rows into '{table_name}'")
+
+        # Optional B-tree indexes for code lookups, built once the data is in
+        for column in index_columns or []:
+            index_name = f"idx_{table_name}_{column}"
+            print(f"Creating index '{index_name}' on {table_name}({column})")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({column})")
+
+        _record_ingest(cursor, table_name, csv_path, source_hash)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
     print(f"Done importing {csv_path} into DB '{db_path}'🐬")
+
+def _stream_csv(cursor, csv_path, table_name, fts_table_name, fts_columns, chunksize, text_columns=()):
+    """Append the CSV to ``table_name`` chunk by chunk; returns the row count"""
+    defer_fts = bulk_load.deferring_indexes()
+    rows_imported = 0
+    insert_sql = None
+    for chunk in _read_csv_chunks(csv_path, chunksize):
+        chunk.columns = clean_column_names(chunk.columns)
+
+        if insert_sql is None:
+            # Create main table if not exists, else append data
+            if table_exists(cursor, table_name):
+                print(f"Table '{table_name}' exists. Appending data...")
+            else:
+                print(f"Creating table '{table_name}' and importing data...")
+                column_types = _csv_column_types(csv_path, chunksize, text_columns)
+                cursor.execute(_table_schema(table_name, column_types))
+            insert_sql = _insert_sql(table_name, chunk.columns)
+            # The sync triggers index each row as it is inserted
+            if not defer_fts:
+                _prepare_fts(cursor, table_name, fts_table_name, fts_columns)
+
+        cursor.executemany(insert_sql, _chunk_rows(chunk))
+        rows_imported += len(chunk)
+
+    if defer_fts:
+        _prepare_fts(cursor, table_name, fts_table_name, fts_columns)
+    return rows_imported
+
+def _insert_sql(table_name, columns):
+    columns_sql = ", ".join(f'"{col}"' for col in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    return f'INSERT INTO "{table_name}" ({columns_sql}) VALUES ({placeholders})'
+
+def _load_incoming(cursor, csv_path, table_name, chunksize):
+    """Stream the CSV into the temp table ``incoming``; returns its columns
+
+    ``incoming`` copies the column types of ``table_name``, so CSV values
+    are converted exactly as they were when the table was loaded. Nothing is
+    loaded when the CSV's columns differ from the table's.
+    """
+    cursor.execute("DROP TABLE IF EXISTS temp.incoming")
+    existing = [row[1] for row in cursor.execute(f'PRAGMA table_info("{table_name}")')]
+    columns = None
+    for chunk in _read_csv_chunks(csv_path, chunksize):
+        chunk.columns = clean_column_names(chunk.columns)
+        if columns is None:
+            columns = list(chunk.columns)
+            if sorted(columns) != sorted(existing):
+                break
+            cursor.execute(f'CREATE TEMP TABLE incoming AS SELECT * FROM main."{table_name}" WHERE 0')
+        cursor.executemany(_insert_sql("incoming", columns), _chunk_rows(chunk))
+    return columns or []
+
+def _apply_csv_diff(cursor, csv_path, table_name, key_column, fts_table_name, fts_columns, chunksize,
+                    text_columns=()):
+    """Bring an existing table in line with the CSV, writing only the rows that differ.
+
+    Rows pair up by key and by their position among rows sharing that key.
+    Unpaired table rows are deleted, unpaired CSV rows inserted, and paired
+    rows whose values differ are updated in place, keeping their rowids.
+    """
+    columns = _load_incoming(cursor, csv_path, table_name, chunksize)
+    existing = [row[1] for row in cursor.execute(f'PRAGMA table_info("{table_name}")')]
+    if sorted(columns) != sorted(existing) or key_column not in columns:
+        print(f"Columns of {csv_path} differ from table '{table_name}'. Reloading it in full...")
+        cursor.execute("DROP TABLE IF EXISTS temp.incoming")
+        for name in filter(None, (fts_table_name, table_name)):
+            cursor.execute(f'DROP TABLE IF EXISTS "{name}"')
+        rows_imported = _stream_csv(cursor, csv_path, table_name, fts_table_name, fts_columns, chunksize,
+                                    text_columns)
+        print(f"Imported {rows_imported:,} rows into '{table_name}'")
+        return
+
+    # From here on the sync triggers keep the FTS index in step with each write
+    _prepare_fts(cursor, table_name, fts_table_name, fts_columns)
+
+    cursor.execute("DROP TABLE IF EXISTS temp.ingest_diff")
+    cursor.execute(f"""
+        CREATE TEMP TABLE ingest_diff AS
+        WITH current_rows AS (
+            SELECT rowid AS target_rowid, "{key_column}" AS row_key,
+                   row_number() OVER (PARTITION BY "{key_column}" ORDER BY rowid) AS occurrence
+            FROM main."{table_name}"
+        ), incoming_rows AS (
+            SELECT rowid AS incoming_rowid, "{key_column}" AS row_key,
+                   row_number() OVER (PARTITION BY "{key_column}" ORDER BY rowid) AS occurrence
+            FROM temp.incoming
+        )
+        SELECT c.target_rowid, i.incoming_rowid
+        FROM current_rows c
+        LEFT JOIN incoming_rows i ON i.row_key IS c.row_key AND i.occurrence = c.occurrence
+        UNION ALL
+        SELECT NULL, i.incoming_rowid
+        FROM incoming_rows i
+        WHERE NOT EXISTS (
+            SELECT 1 FROM current_rows c WHERE c.row_key IS i.row_key AND c.occurrence = i.occurrence
+        )
+    """)
+    unchanged = " AND ".join(f't."{col}" IS i."{col}"' for col in columns)
+    cursor.execute(f"""
+        DELETE FROM temp.ingest_diff
+        WHERE target_rowid IS NOT NULL AND incoming_rowid IS NOT NULL
+          AND EXISTS (
+            SELECT 1 FROM main."{table_name}" t, temp.incoming i
+            WHERE t.rowid = target_rowid AND i.rowid = incoming_rowid AND {unchanged}
+        )
+    """)
+
+    cursor.execute(f"""
+        DELETE FROM main."{table_name}"
+        WHERE rowid IN (SELECT target_rowid FROM temp.ingest_diff WHERE incoming_rowid IS NULL)
+    """)
+    deleted = cursor.rowcount
+    assignments = ", ".join(f'"{col}" = changed."{col}"' for col in columns)
+    cursor.execute(f"""
+        UPDATE main."{table_name}" SET {assignments}
+        FROM (
+            SELECT d.target_rowid AS changed_rowid, i.*
+            FROM temp.ingest_diff d JOIN temp.incoming i ON i.rowid = d.incoming_rowid
+            WHERE d.target_rowid IS NOT NULL
+        ) AS changed
+        WHERE main."{table_name}".rowid = changed.changed_rowid
+    """)
+    updated = cursor.rowcount
+    columns_sql = ", ".join(f'"{col}"' for col in columns)
+    cursor.execute(f"""
+        INSERT INTO main."{table_name}" ({columns_sql})
+        SELECT {columns_sql} FROM temp.incoming
+        WHERE rowid IN (SELECT incoming_rowid FROM temp.ingest_diff WHERE target_rowid IS NULL)
+        ORDER BY rowid
+    """)
+    inserted = cursor.rowcount
+
+    cursor.execute("DROP TABLE temp.ingest_diff")
+    cursor.execute("DROP TABLE temp.incoming")
+    print(f"Table '{table_name}': {inserted:,} inserted, {updated:,} updated, {deleted:,} deleted")
+
+def fts_trigger_sql(table_name, fts_table_name, fts_columns):
+    """Statements creating the triggers that keep an external-content FTS5 table in sync"""
+    columns_sql = ", ".join(fts_columns)
+    new_values = ", ".join(f"new.{col}" for col in fts_columns)
+    old_values = ", ".join(f"old.{col}" for col in fts_columns)
+    insert = f"INSERT INTO {fts_table_name}(rowid, {columns_sql}) VALUES (new.rowid, {new_values});"
+    delete = (f"INSERT INTO {fts_table_name}({fts_table_name}, rowid, {columns_sql}) "
+              f"VALUES ('delete', old.rowid, {old_values});")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table_name}_ai AFTER INSERT ON {table_name} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table_name}_ad AFTER DELETE ON {table_name} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table_name}_au AFTER UPDATE OF {columns_sql} ON {table_name} "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+def _prepare_fts(cursor, table_name, fts_table_name, fts_columns):
+    """Create the FTS5 table and its sync triggers if needed.
+
+    The index is rebuilt from the base table whenever the table or any of
+    its triggers had to be created, since rows written before that were not
+    indexed.
+    """
+    if not (fts_columns and fts_table_name):
+        return False
+    columns_sql = ", ".join(fts_columns)
+    stale = False
+    if table_exists(cursor, fts_table_name):
+        print(f"FTS5 virtual table '{fts_table_name}' already exists.")
+    else:
+        print(f"Creating FTS5 virtual table '{fts_table_name}' on columns: {fts_columns}")
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE {fts_table_name} USING fts5(
+                {columns_sql},
+                content='{table_name}',
+                content_rowid='rowid'
+            )
+        """)
+        stale = True
+
+    triggers = {f"{fts_table_name}_{suffix}" for suffix in ("ai", "ad", "au")}
+    existing = {row[0] for row in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='trigger' AND tbl_name=?", (table_name,))}
+    if not triggers <= existing:
+        print(f"Creating sync triggers for '{fts_table_name}'")
+        for statement in fts_trigger_sql(table_name, fts_table_name, fts_columns):
+            cursor.execute(statement)
+        stale = True
+
+    if stale and cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{table_name}")').fetchone()[0]:
+        print(f"Building FTS5 index '{fts_table_name}'")
+        cursor.execute(f"INSERT INTO {fts_table_name}({fts_table_name}) VALUES ('rebuild')")
+    return True
+
+# FTS5 shadow tables of an external-content index (there is no _content table)
+_FTS_SHADOW_TABLES = ("data", "idx", "docsize", "config")
+
+def _ingest_staging(source, staging_path):
+    """Process-pool worker: import one CSV into its own staging database"""
+    with bulk_load.bulk_session(staging_path, finalize_on_exit=False):
+        index_csv_to_sqlite(db_path=staging_path, **source)
+    return staging_path
+
+def merge_staging_database(db_path, staging_path, table_name, fts_table_name=None, index_columns=None, **_):
+    """Copy a staged table and its FTS index into ``db_path``, replacing any previous copy.
+
+    Rows keep their rowids, so the FTS5 shadow tables are copied as they are
+    rather than re-tokenizing the text.
+    """
+    conn = bulk_load.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("ATTACH DATABASE ? AS staging", (staging_path,))
+    try:
+        cursor.execute("BEGIN")
+        for name in filter(None, (fts_table_name, table_name)):
+            cursor.execute(f'DROP TABLE IF EXISTS main."{name}"')
+
+        create_sql = cursor.execute(
+            "SELECT sql FROM staging.sqlite_master WHERE type='table' AND name=?", (table_name,)
+        ).fetchone()[0]
+        cursor.execute(create_sql)
+        columns = [row[1] for row in cursor.execute(f'PRAGMA staging.table_info("{table_name}")')]
+        columns_sql = ", ".join(f'"{col}"' for col in ["rowid", *columns])
+        cursor.execute(f'''
+            INSERT INTO main."{table_name}" ({columns_sql})
+            SELECT {columns_sql} FROM staging."{table_name}"
+        ''')
+        print(f"Merged {cursor.rowcount:,} rows into '{table_name}'")
+
+        if fts_table_name:
+            fts_sql = cursor.execute(
+                "SELECT sql FROM staging.sqlite_master WHERE type='table' AND name=?", (fts_table_name,)
+            ).fetchone()[0]
+            cursor.execute(fts_sql)
+            for suffix in _FTS_SHADOW_TABLES:
+                shadow = f"{fts_table_name}_{suffix}"
+                cursor.execute(f'DELETE FROM main."{shadow}"')
+                cursor.execute(f'INSERT INTO main."{shadow}" SELECT * FROM staging."{shadow}"')
+            # Sync triggers go in last so the copied rows are not indexed twice
+            for (trigger_sql,) in cursor.execute(
+                "SELECT sql FROM staging.sqlite_master WHERE type='trigger' AND tbl_name=?", (table_name,)
+            ).fetchall():
+                cursor.execute(trigger_sql)
+
+        for column in index_columns or []:
+            index_name = f"idx_{table_name}_{column}"
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({column})")
+
+        # Carry the source hash over so the next run can skip or diff this table
+        source_hash, csv_path = cursor.execute(
+            "SELECT source_sha256, source_path FROM staging.ingest_state WHERE table_name = ?", (table_name,)
+        ).fetchone()
+        _record_ingest(cursor, table_name, csv_path, source_hash)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def index_csvs_in_parallel(sources, db_path, workers=None):
+    """Import several CSVs at once, each into a staging database, then merge them.
+
+    ``sources`` are index_csv_to_sqlite keyword arguments without ``db_path``.
+    Tables not yet in ``db_path`` are imported by a process pool; each staging
+    database is merged with ATTACH and INSERT ... SELECT, in the order given,
+    as soon as it is ready. Tables that already exist are updated
+    incrementally in this process while the pool works.
+    """
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        staged = [source for source in sources if not table_exists(cursor, source["table_name"])]
+    finally:
+        conn.close()
+    existing = [source for source in sources if source not in staged]
+
+    workers = workers or min(len(staged), os.cpu_count() or 1) or 1
+    with tempfile.TemporaryDirectory(prefix="staging-", dir=os.path.dirname(db_path) or ".") as staging_dir:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_ingest_staging, source, os.path.join(staging_dir, f"{source['table_name']}.db"))
+                for source in staged
+            ]
+            for source in existing:
+                index_csv_to_sqlite(db_path=db_path, **source)
+            for source, future in zip(staged, futures):
+                staging_path = future.result()
+                print(f"Merging staged '{source['table_name']}' into {db_path}...")
+                merge_staging_database(db_path, staging_path, **source)
+    return len(sources)
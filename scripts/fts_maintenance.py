@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+FTS5 index maintenance for the terminology database.
+
+Runs FTS5's ``rebuild``, ``optimize`` or ``integrity-check`` on every FTS
+table (or the ones named with --table) and reports each index's size,
+document count, stored blocks and segment structure. Many segments spread
+over several levels mean queries read more b-trees; ``optimize`` merges them
+into one. Segments and levels come from FTS5's internal structure record,
+which SQLite does not document; they are reported as "unknown" when the
+record does not decode cleanly.
+
+    python scripts/fts_maintenance.py                    # report only
+    python scripts/fts_maintenance.py optimize
+    python scripts/fts_maintenance.py rebuild --table nam_fts
+    python scripts/fts_maintenance.py integrity-check --json
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import time
+
+DB_PATH = "db/ayush_icd11_combined.db"
+
+COMMANDS = ("report", "rebuild", "optimize", "integrity-check")
+
+# Shadow tables holding an external-content FTS5 index
+_SHADOW_SUFFIXES = ("data", "idx", "docsize", "config")
+
+# Rowid of the structure record in <fts>_data, and the marker of its v2 format
+_STRUCTURE_ROWID = 10
+_STRUCTURE_V2 = b"\xff\x00\x00\x01"
+
+UNKNOWN = "unknown"
+
+
+def fts_tables(conn):
+    """Names of the FTS5 virtual tables in the database"""
+    return [row[0] for row in conn.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%USING fts5%'
+        ORDER BY name
+    """)]
+
+
+def _varint(data: bytes, offset: int):
+    """Decode an SQLite varint at ``offset``; returns (value, next offset)"""
+    value = 0
+    for i in range(8):
+        byte = data[offset + i]
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, offset + i + 1
+    return (value << 8) | data[offset + 8], offset + 9
+
+
+def parse_structure(record: bytes) -> dict:
+    """Levels and segments described by an FTS5 structure record
+
+    Raises ValueError unless the record decodes to exactly its own length
+    with consistent counts, so a changed format is never misread.
+    """
+    try:
+        offset = 4  # configuration cookie
+        v2 = record[offset:offset + 4] == _STRUCTURE_V2
+        if v2:
+            offset += 4
+        n_levels, offset = _varint(record, offset)
+        n_segments, offset = _varint(record, offset)
+        write_counter, offset = _varint(record, offset)
+        if v2:
+            _, offset = _varint(record, offset)  # origin counter
+        levels = []
+        pages = 0
+        for level in range(n_levels):
+            merging, offset = _varint(record, offset)
+            segments, offset = _varint(record, offset)
+            for _ in range(segments):
+                _, offset = _varint(record, offset)  # segment id
+                first, offset = _varint(record, offset)
+                last, offset = _varint(record, offset)
+                if last < first:
+                    raise ValueError("segment ends before it starts")
+                pages += last - first + 1
+                if v2:
+                    for _ in range(5):  # origin range, tombstone and entry counts
+                        _, offset = _varint(record, offset)
+            levels.append({"level": level, "segments": segments, "merging": merging})
+    except IndexError:
+        raise ValueError("structure record is shorter than its contents") from None
+    if offset != len(record):
+        raise ValueError(f"structure record has {len(record) - offset} unexpected trailing bytes")
+    if sum(level["segments"] for level in levels) != n_segments:
+        raise ValueError("segment count does not match the levels")
+    return {"segments": n_segments, "leaf_pages": pages, "write_counter": write_counter,
+            "levels": [level for level in levels if level["segments"]]}
+
+
+def _index_bytes(conn, fts_table: str) -> int:
+    names = [f"{fts_table}_{suffix}" for suffix in _SHADOW_SUFFIXES]
+    placeholders = ", ".join("?" for _ in names)
+    try:
+        row = conn.execute(f"SELECT sum(pgsize) FROM dbstat WHERE name IN ({placeholders})", names).fetchone()
+        return row[0] or 0
+    except sqlite3.OperationalError:
+        # SQLite built without the dbstat table: count stored index blocks instead
+        return conn.execute(f"SELECT coalesce(sum(length(block)), 0) FROM {fts_table}_data").fetchone()[0]
+
+
+def index_stats(conn, fts_table: str) -> dict:
+    """Size, document count and merge structure of one FTS5 index"""
+    config = dict(conn.execute(f"SELECT k, v FROM {fts_table}_config"))
+    stats = {
+        "table": fts_table,
+        "documents": conn.execute(f"SELECT count(*) FROM {fts_table}_docsize").fetchone()[0],
+        "index_bytes": _index_bytes(conn, fts_table),
+        # Rows of the documented %_data shadow table: leaf pages plus bookkeeping
+        "data_blocks": conn.execute(f"SELECT count(*) FROM {fts_table}_data").fetchone()[0],
+        "automerge": int(config.get("automerge", 4)),
+        "crisismerge": int(config.get("crisismerge", 16)),
+    }
+    record = conn.execute(f"SELECT block FROM {fts_table}_data WHERE rowid = ?", (_STRUCTURE_ROWID,)).fetchone()
+    try:
+        stats.update(parse_structure(record[0]) if record else {"segments": 0, "leaf_pages": 0, "levels": []})
+    except (ValueError, TypeError) as exc:
+        stats.update(segments=UNKNOWN, leaf_pages=UNKNOWN, levels=UNKNOWN, structure_error=str(exc))
+    return stats
+
+
+def run_command(conn, fts_table: str, command: str) -> dict:
+    """Run one FTS5 command; returns its duration and, for integrity-check, the outcome"""
+    started = time.perf_counter()
+    result = {"command": command, "ok": True}
+    try:
+        if command == "integrity-check":
+            # rank = 1 also compares the index with the external content table
+            conn.execute(f"INSERT INTO {fts_table}({fts_table}, rank) VALUES (?, 1)", (command,))
+        else:
+            conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES (?)", (command,))
+        conn.commit()
+    except sqlite3.DatabaseError as exc:
+        if command != "integrity-check":
+            raise
+        conn.rollback()
+        result.update(ok=False, error=str(exc))
+    result["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def maintain(db_path: str, command: str = "report", tables=None):
+    """Run ``command`` on each FTS table and collect before/after statistics"""
+    conn = sqlite3.connect(db_path)
+    try:
+        names = fts_tables(conn)
+        unknown = sorted(set(tables or ()) - set(names))
+        if unknown:
+            raise ValueError(f"Not FTS5 tables: {', '.join(unknown)}")
+        report = []
+        for name in tables or names:
+            entry = {"before": index_stats(conn, name)}
+            if command != "report":
+                entry["result"] = run_command(conn, name, command)
+                if command != "integrity-check":
+                    entry["after"] = index_stats(conn, name)
+            report.append(entry)
+        return report
+    finally:
+        conn.close()
+
+
+def _format(entry) -> str:
+    before = entry["before"]
+    levels = before["levels"] if before["levels"] == UNKNOWN else len(before["levels"])
+    line = (f"{before['table']:<12} {before['documents']:>8,} docs  {before['index_bytes']:>10,} bytes  "
+            f"{before['data_blocks']:>6,} blocks  {before['segments']} segments / {levels} levels")
+    result = entry.get("result")
+    if result:
+        outcome = "ok" if result["ok"] else f"FAILED: {result['error']}"
+        line += f"  | {result['command']} {outcome} in {result['duration_ms']:.1f}ms"
+    after = entry.get("after")
+    if after:
+        line += f" -> {after['index_bytes']:,} bytes, {after['data_blocks']:,} blocks, {after['segments']} segments"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", nargs="?", default="report", choices=COMMANDS)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--table", action="append", help="FTS table to maintain (repeatable; default all)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = maintain(args.db, args.command, args.table)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for entry in report:
+            print(_format(entry))
+    return 0 if all(entry.get("result", {}).get("ok", True) for entry in report) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,12 +6,59 @@ This script performs all necessary initialization steps:
 2. Creates database and indexes
 3. Normalizes data
 4. Generates comprehensive concept mappings
+5. Pre-renders the FHIR ConceptMap served for each code
 """
 
 import os
 import sys
+import time
+from contextlib import nullcontext
 from datetime import datetime
 
+# CSV datasets indexed in step 2: (description, index_csv_to_sqlite arguments)
+TERMINOLOGY_SOURCES = [
+    # ICD-11 TM2
+    ("Indexing ICD-11 TM2 data", dict(
+        csv_path="data/ICD-11.csv",
+        table_name="icd11",
+        fts_table_name="icd11_fts",
+        fts_columns=["code", "title"],
+        index_columns=["code"]
+    )),
+    # NAMASTE Ayurveda Morbidity (primary focus)
+    ("Indexing NAMASTE Ayurveda Morbidity data", dict(
+        csv_path="data/namaste_ayurveda_morbidity.csv",
+        table_name="nam",
+        fts_table_name="nam_fts",
+        fts_columns=["namc_code","namc_term", "long_definition"],
+        index_columns=["namc_code"]
+    )),
+    # NAMASTE Siddha Morbidity
+    ("Indexing NAMASTE Siddha Morbidity data", dict(
+        csv_path="data/namaste_siddha_morbidity.csv",
+        table_name="nsm",
+        fts_table_name="nsm_fts",
+        fts_columns=["namc_code", "namc_term", "short_definition"],
+        index_columns=["namc_code"]
+    )),
+    # NAMASTE Unani Morbidity
+    ("Indexing NAMASTE Unani Morbidity data", dict(
+        csv_path="data/namaste_unani_morbidity.csv",
+        table_name="num",
+        fts_table_name="num_fts",
+        fts_columns=["numc_code", "short_definition"],
+        index_columns=["numc_code"]
+    )),
+    # Ayurveda Standard Terminology
+    ("Indexing Ayurveda Standard Terminology data", dict(
+        csv_path="data/ayurveda_standard_terminology.csv",
+        table_name="ast",
+        fts_table_name="ast_fts",
+        fts_columns=["code","parent_id","word","short_defination"],
+        index_columns=["code"]
+    )),
+]
+
 def print_step(step_num, description):
     """Print a formatted step indicator"""
     print(f"\n🔧 STEP {step_num}: {description}")
@@ -33,14 +80,17 @@ def main():
     print("🚀 NAMASTE-ICD-11 INTEGRATION SETUP")
     print("=" * 60)
     print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    started = time.perf_counter()
     print("This script will set up the complete NAMASTE-ICD-11 integration system.")
     
     # Import required modules
     from download_icd11 import download_icd11
     from download_namaste import download_namaste
-    from create_database import index_csv_to_sqlite
+    from create_database import index_csv_to_sqlite, index_csvs_in_parallel
     from normalize_database import normalize_spaces_in_database
     from create_concept_map import create_concept_map_table, create_precise_mappings
+    from render_concept_maps import materialize_concept_maps
+    from bulk_load import bulk_session
     
     DB_PATH = "db/ayush_icd11_combined.db"
     
@@ -49,76 +99,38 @@ def main():
     run_step("Downloading ICD-11 TM2 dataset", download_icd11)
     run_step("Downloading NAMASTE datasets", download_namaste)
     
-    # Step 2: Create database and indexes
-    print_step(2, "CREATING DATABASE AND INDEXES")
-    
-    # Create database directory
-    os.makedirs("db", exist_ok=True)
-    
-    # Index ICD-11 TM2
-    run_step(
-        "Indexing ICD-11 TM2 data",
-        index_csv_to_sqlite,
-        csv_path="data/ICD-11.csv",
-        db_path=DB_PATH,
-        table_name="icd11",
-        fts_table_name="icd11_fts",
-        fts_columns=["code", "title"]
-    )
-    
-    # Index NAMASTE Ayurveda Morbidity (primary focus)
-    run_step(
-        "Indexing NAMASTE Ayurveda Morbidity data",
-        index_csv_to_sqlite,
-        csv_path="data/namaste_ayurveda_morbidity.csv",
-        db_path=DB_PATH,
-        table_name="nam",
-        fts_table_name="nam_fts",
-        fts_columns=["namc_code","namc_term", "long_definition"]
-    )
-    
-    # Index NAMASTE Siddha Morbidity
-    run_step(
-        "Indexing NAMASTE Siddha Morbidity data",
-        index_csv_to_sqlite,
-        csv_path="data/namaste_siddha_morbidity.csv",
-        db_path=DB_PATH,
-        table_name="nsm",
-        fts_table_name="nsm_fts",
-        fts_columns=["namc_code", "namc_term", "short_definition"]
-    )
-    
-    # Index NAMASTE Unani Morbidity
-    run_step(
-        "Indexing NAMASTE Unani Morbidity data",
-        index_csv_to_sqlite,
-        csv_path="data/namaste_unani_morbidity.csv",
-        db_path=DB_PATH,
-        table_name="num",
-        fts_table_name="num_fts",
-        fts_columns=["numc_code", "short_definition"]
-    )
-    
-    # Index Ayurveda Standard Terminology
-    run_step(
-        "Indexing Ayurveda Standard Terminology data",
-        index_csv_to_sqlite,
-        csv_path="data/ayurveda_standard_terminology.csv",
-        db_path=DB_PATH,
-        table_name="ast",
-        fts_table_name="ast_fts",
-        fts_columns=["code","parent_id","word","short_defination"]
-    )
+    # Steps 2-4 write the database under the bulk-load profile unless --no-bulk;
+    # --parallel imports the CSVs in a process pool via staging databases
+    session = nullcontext() if "--no-bulk" in sys.argv[1:] else bulk_session(DB_PATH)
+    with session:
+        # Step 2: Create database and indexes
+        print_step(2, "CREATING DATABASE AND INDEXES")
+    
+        # Create database directory
+        os.makedirs("db", exist_ok=True)
+    
+        if "--parallel" in sys.argv[1:]:
+            run_step(
+                f"Indexing {len(TERMINOLOGY_SOURCES)} datasets in parallel",
+                index_csvs_in_parallel,
+                [source for _, source in TERMINOLOGY_SOURCES],
+                DB_PATH
+            )
+        else:
+            for description, source in TERMINOLOGY_SOURCES:
+                run_step(description, index_csv_to_sqlite, db_path=DB_PATH, **source)
     
-    # Step 3: Normalize database
-    print_step(3, "NORMALIZING DATABASE")
-    run_step("Normalizing spacing and formatting", normalize_spaces_in_database)
+        # Step 3: Normalize database
+        print_step(3, "NORMALIZING DATABASE")
+        run_step("Normalizing spacing and formatting", normalize_spaces_in_database)
     
-    # Step 4: Generate concept mappings
-    print_step(4, "GENERATING COMPREHENSIVE CONCEPT MAPPINGS")
-    run_step("Creating concept mapping table", create_concept_map_table)
-    mapping_count = run_step("Generating mappings", create_precise_mappings)
-    print(f"✅ Generated {mapping_count:,} concept mappings")
+        # Step 4: Generate concept mappings
+        print_step(4, "GENERATING COMPREHENSIVE CONCEPT MAPPINGS")
+        run_step("Creating concept mapping table", create_concept_map_table)
+        mapping_count = run_step("Generating mappings", create_precise_mappings)
+        print(f"✅ Generated {mapping_count:,} concept mappings")
+        rendered_count = run_step("Pre-rendering ConceptMap resources", materialize_concept_maps)
+        print(f"✅ Pre-rendered {rendered_count:,} ConceptMap resources")
     
     # Step 5: Verify setup
     print_step(5, "VERIFYING SETUP")
@@ -130,7 +142,7 @@ def main():
     # Check tables
     cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
     tables = [row[0] for row in cur.fetchall()]
-    expected_tables = ["icd11", "nam", "nsm", "num", "ast", "concept_map", 
+    expected_tables = ["icd11", "nam", "nsm", "num", "ast", "concept_map", "concept_map_rendered",
                       "icd11_fts", "nam_fts", "nsm_fts", "num_fts", "ast_fts"]
     
     for table in expected_tables:
@@ -167,7 +179,8 @@ def main():
     print("2. Start API: uvicorn app.main:app --reload")
     print("3. View API docs: http://localhost:8000/docs")
     print("4. Export mappings: python scripts/export_mappings.py")
-    print(f"\n⏱️  Setup completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"\n⏱️  Setup completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} "
+          f"({time.perf_counter() - started:.1f}s)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the ConceptMap API.
+
+Starts the service under uvicorn, drives GET /ConceptMap/{code} with
+concurrent async clients over a realistic code mix, and reports throughput and
+latency percentiles. The baseline records the machine it was measured on.
+On a machine with the same system, architecture and CPU count the run fails
+(exit code 1) when throughput drops or tail latency grows beyond the allowed
+tolerance. Elsewhere the baseline is shown for reference unless --enforce
+is given.
+
+    python scripts/load_benchmark.py --duration 15 --concurrency 32
+    python scripts/load_benchmark.py --enforce            # gate on any machine
+    python scripts/load_benchmark.py --update-baseline    # record a new baseline
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = "db/ayush_icd11_combined.db"
+BASELINE_PATH = os.path.join(ROOT, "scripts", "load_benchmark_baseline.json")
+
+# Share of requests per kind of code
+CODE_MIX = {"hit": 0.70, "variant": 0.15, "miss": 0.15}
+
+
+def build_code_mix(db_path: str, size: int = 2000, seed: int = 7):
+    """Weighted list of (kind, code) mirroring production lookups.
+
+    Hits are stored source codes; variants are the bare code before the
+    bracket (resolved by prefix matching) and bracketed codes with extra
+    whitespace (resolved by normalization); misses are codes that do not exist.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        codes = [row[0] for row in conn.execute("SELECT DISTINCT source_code FROM concept_map")]
+    finally:
+        conn.close()
+    if not codes:
+        raise RuntimeError(f"No concept mappings found in {db_path}")
+
+    bracketed = [code for code in codes if "(" in code]
+    variants = sorted({code.split("(", 1)[0].strip() for code in bracketed})
+    variants += [code.replace(" (", "  (") for code in bracketed[:50]]
+    rng = random.Random(seed)
+    pools = {
+        "hit": codes,
+        "variant": variants or codes,
+        "miss": [f"ZZ{n:04d}" for n in range(200)],
+    }
+    kinds = rng.choices(list(CODE_MIX), weights=list(CODE_MIX.values()), k=size)
+    return [(kind, rng.choice(pools[kind])) for kind in kinds]
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: str, port: int, workers: int = 1):
+    env = dict(os.environ, TERMINOLOGY_DB_PATH=os.path.abspath(db_path))
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    return subprocess.Popen(command, cwd=ROOT, env=env)
+
+
+def wait_until_ready(base_url: str, process, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Server at {base_url} not ready after {timeout:.0f}s")
+
+
+async def _drive(base_url: str, mix, concurrency: int, duration: float):
+    latencies = []
+    statuses = {}
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(offset: int):
+            nonlocal errors
+            position = offset
+            while time.perf_counter() < deadline:
+                kind, code = mix[position % len(mix)]
+                position += concurrency
+                start = time.perf_counter()
+                try:
+                    response = await client.get(f"/ConceptMap/{quote(code, safe='')}")
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+                key = f"{kind}:{response.status_code}"
+                statuses[key] = statuses.get(key, 0) + 1
+                if response.status_code not in (200, 404):
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, statuses, errors, elapsed
+
+
+def run_load(base_url: str, mix, concurrency: int, duration: float, warmup: float) -> dict:
+    if warmup > 0:
+        asyncio.run(_drive(base_url, mix, concurrency, warmup))
+    latencies, statuses, errors, elapsed = asyncio.run(_drive(base_url, mix, concurrency, duration))
+    latencies.sort()
+    requests = len(latencies)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def check_regression(result: dict, baseline: dict, tolerance: float):
+    """List of regressions of ``result`` against ``baseline``; empty if none"""
+    failures = []
+    if result["errors"]:
+        failures.append(f"{result['errors']} failed requests")
+    floor = baseline["throughput_rps"] * (1 - tolerance)
+    if result["throughput_rps"] < floor:
+        failures.append(f"throughput {result['throughput_rps']} rps < {floor:.1f} rps "
+                        f"(baseline {baseline['throughput_rps']})")
+    for metric in ("p95_ms", "p99_ms"):
+        ceiling = baseline[metric] * (1 + tolerance)
+        if result[metric] > ceiling:
+            failures.append(f"{metric} {result[metric]} > {ceiling:.3f} (baseline {baseline[metric]})")
+    return failures
+
+
+def machine_profile() -> dict:
+    """The parts of the host that baseline numbers depend on"""
+    return {
+        "system": platform.system(),
+        "arch": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+# Host properties that change throughput; the Python patch level does not
+_GATED_MACHINE_FIELDS = ("system", "arch", "cpus")
+
+
+def compare_to_baseline(result: dict, baseline: dict, tolerance: float, enforce: bool = False):
+    """(regressions, enforced): regressions fail the run on a machine like the
+    baseline's, or on any machine with ``enforce``"""
+    recorded = baseline.get("machine") or {}
+    current = machine_profile()
+    enforced = enforce or (
+        bool(recorded) and all(recorded.get(field) == current[field] for field in _GATED_MACHINE_FIELDS)
+    )
+    return check_regression(result, baseline, tolerance), enforced
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", default=DB_PATH, help="database served during the run")
+    parser.add_argument("--url", help="test an already running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before the run")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.30,
+                        help="allowed fractional drop in throughput / growth in p95 and p99")
+    parser.add_argument("--enforce", action="store_true",
+                        help="fail on regressions even if the baseline was recorded on another machine")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args(argv)
+
+    mix = build_code_mix(args.db)
+    process = None
+    base_url = args.url
+    if base_url is None:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = start_server(args.db, port, args.workers)
+    try:
+        if process is not None:
+            wait_until_ready(base_url, process)
+        result = run_load(base_url, mix, args.concurrency, args.duration, args.warmup)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {key: result[key] for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "concurrency")}
+        baseline["machine"] = machine_profile()
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    failures, enforced = compare_to_baseline(result, baseline, args.tolerance, args.enforce)
+    if not enforced:
+        print(f"Baseline was recorded on {baseline.get('machine', 'an unrecorded machine')}, "
+              f"not {machine_profile()}; its numbers are for reference only (pass --enforce to gate).")
+    for failure in failures:
+        print(f"{'REGRESSION' if enforced else 'Slower than reference'}: {failure}")
+    return 1 if failures and enforced else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,9 +2,10 @@
 """
 Normalize spaces in the concept_map source_code field
 """
-import sqlite3
 import re
 
+import bulk_load
+
 DB_PATH = "db/ayush_icd11_combined.db"
 
 def normalize_spaces_in_database():
@@ -12,7 +13,7 @@ def normalize_spaces_in_database():
     print("NORMALIZING SPACES IN CONCEPT_MAP DATABASE")
     print("="*50)
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = bulk_load.connect(DB_PATH)
     cur = conn.cursor()
     
     # First, show current spacing issues
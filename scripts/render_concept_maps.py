@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Pre-render the final FHIR ConceptMap JSON for every NAMASTE source code.
+
+Runs after create_precise_mappings. The API serves these bytes from a single
+primary-key lookup on concept_map_rendered instead of rebuilding the resource
+on every request.
+"""
+import gzip
+import os
+import sys
+from datetime import datetime
+
+import bulk_load
+
+# Reuse the API's renderer so pre-rendered bodies are byte-identical
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.codes import code_key, matches_source_code, normalize_code
+from app.conceptmap import CONCEPT_MAP_VERSION, render_concept_map, serialize_resource
+
+DB_PATH = "db/ayush_icd11_combined.db"
+
+
+def create_rendered_table(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS concept_map_rendered (
+        lookup_code TEXT NOT NULL,
+        version TEXT NOT NULL,
+        body BLOB NOT NULL,
+        encoding TEXT NOT NULL DEFAULT 'identity',
+        PRIMARY KEY (lookup_code, version)
+    ) WITHOUT ROWID
+    """)
+    # Date stamped on every ConceptMap of a version, rendered or built on request
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS concept_map_release (
+        version TEXT PRIMARY KEY,
+        date TEXT NOT NULL
+    )
+    """)
+
+
+def _lookup_codes(source_codes):
+    """Every stored code plus its bare form before the bracket, e.g. SR10 for SR10 (AAA-2.1)"""
+    codes = set(source_codes)
+    for code in source_codes:
+        bare = normalize_code(code.split("(", 1)[0])
+        if bare:
+            codes.add(bare)
+    return sorted(codes)
+
+
+def materialize_concept_maps(db_path: str = DB_PATH, compress: bool = False, validate: bool = None):
+    """Render and store the ConceptMap for every lookup code; returns the count"""
+    conn = bulk_load.connect(db_path)
+    cur = conn.cursor()
+
+    print("Loading mappings with display names...")
+    cur.execute("""
+        SELECT cm.source_code, cm.target_code, cm.equivalence,
+               (SELECT n.namc_term FROM nam n WHERE n.namc_code = cm.source_code LIMIT 1),
+               (SELECT i.title FROM icd11 i WHERE i.code = cm.target_code LIMIT 1)
+        FROM concept_map cm
+        ORDER BY cm.id
+    """)
+    buckets = {}
+    source_codes = set()
+    for source_code, target_code, equivalence, namaste_term, icd11_title in cur.fetchall():
+        source_code = normalize_code(source_code)
+        source_codes.add(source_code)
+        buckets.setdefault(code_key(source_code), []).append(
+            (source_code, target_code, equivalence, namaste_term, icd11_title)
+        )
+
+    date = datetime.now().date().isoformat()
+    encoding = "gzip" if compress else "identity"
+    rendered = []
+    raw_bytes = stored_bytes = 0
+    for lookup_code in _lookup_codes(source_codes):
+        rows = [row for row in buckets.get(code_key(lookup_code), ()) if matches_source_code(row[0], lookup_code)]
+        if not rows:
+            continue
+        body = serialize_resource(render_concept_map(lookup_code, rows, date, validate))
+        raw_bytes += len(body)
+        if compress:
+            body = gzip.compress(body, compresslevel=9, mtime=0)
+        stored_bytes += len(body)
+        rendered.append((lookup_code, CONCEPT_MAP_VERSION, body, encoding))
+
+    print(f"Storing {len(rendered)} rendered ConceptMaps ({encoding})...")
+    create_rendered_table(conn)
+    cur.execute("DELETE FROM concept_map_rendered WHERE version = ?", (CONCEPT_MAP_VERSION,))
+    cur.executemany(
+        "INSERT INTO concept_map_rendered (lookup_code, version, body, encoding) VALUES (?, ?, ?, ?)",
+        rendered,
+    )
+    cur.execute("INSERT OR REPLACE INTO concept_map_release (version, date) VALUES (?, ?)",
+                (CONCEPT_MAP_VERSION, date))
+    conn.commit()
+    conn.close()
+
+    print(f"  - Rendered JSON: {raw_bytes:,} bytes")
+    print(f"  - Stored: {stored_bytes:,} bytes")
+    return len(rendered)
+
+
+if __name__ == "__main__":
+    count = materialize_concept_maps(compress="--compress" in sys.argv[1:])
+    print(f"concept_map_rendered populated with {count} ConceptMap resources.")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Cold-start report for the terminology service.
+
+Breaks import time down by top-level package (``python -X importtime``) and
+times application startup with and without TERMINOLOGY_WARMUP, including the
+latency of the first and second ConceptMap request. Each measurement runs in a
+fresh interpreter so nothing is already imported or cached.
+
+    python scripts/startup_report.py
+    python scripts/startup_report.py --top 15 --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = "db/ayush_icd11_combined.db"
+
+# Runs in a child interpreter: start the app through its lifespan, then time
+# the first two lookups of the same code
+_STARTUP_PROBE = """
+import json, sqlite3, time
+started = time.perf_counter()
+from fastapi.testclient import TestClient
+from app import config
+from app.main import app, startup
+imported = time.perf_counter()
+code = sqlite3.connect(config.DB_PATH).execute(
+    "SELECT source_code FROM concept_map ORDER BY source_code LIMIT 1").fetchone()[0]
+with TestClient(app) as client:
+    ready = time.perf_counter()
+    latencies = []
+    for _ in range(2):
+        start = time.perf_counter()
+        client.get("/ConceptMap/" + code)
+        latencies.append(time.perf_counter() - start)
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "phases_ms": {name: seconds * 1000 for name, seconds in startup.stages.items()},
+    "first_request_ms": latencies[0] * 1000,
+    "second_request_ms": latencies[1] * 1000,
+}))
+"""
+
+
+def import_breakdown(module: str = "app.main") -> dict:
+    """Self and cumulative import time per top-level package, in milliseconds"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(completed.stderr)
+
+
+def parse_importtime(text: str) -> dict:
+    """Aggregate ``-X importtime`` output by top-level package.
+
+    ``self_ms`` sums every module of the package; ``cumulative_ms`` is its
+    most expensive single import including dependencies. ``total_ms`` is the
+    cost of everything imported.
+    """
+    packages = {}
+    total = 0
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # column header
+        name = fields[2].rstrip()
+        package = name.strip().split(".")[0]
+        entry = packages.setdefault(package, {"self_ms": 0.0, "cumulative_ms": 0.0, "modules": 0})
+        entry["self_ms"] += self_us / 1000
+        entry["cumulative_ms"] = max(entry["cumulative_ms"], cumulative_us / 1000)
+        entry["modules"] += 1
+        if not name.startswith("  "):
+            total += cumulative_us
+    for entry in packages.values():
+        entry["self_ms"] = round(entry["self_ms"], 3)
+        entry["cumulative_ms"] = round(entry["cumulative_ms"], 3)
+    ordered = dict(sorted(packages.items(), key=lambda item: item[1]["self_ms"], reverse=True))
+    return {"total_ms": round(total / 1000, 3), "packages": ordered}
+
+
+def startup_timing(db_path: str, warmup: bool) -> dict:
+    env = dict(os.environ, TERMINOLOGY_DB_PATH=os.path.abspath(db_path),
+               TERMINOLOGY_WARMUP="1" if warmup else "0")
+    completed = subprocess.run([sys.executable, "-c", _STARTUP_PROBE], cwd=ROOT, env=env,
+                               capture_output=True, text=True, check=True)
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    return _rounded(report)
+
+
+def _rounded(value):
+    if isinstance(value, dict):
+        return {key: _rounded(item) for key, item in value.items()}
+    return round(value, 3) if isinstance(value, float) else value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", default=DB_PATH, help="database opened during startup")
+    parser.add_argument("--top", type=int, default=10, help="packages listed in the import breakdown")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    imports = import_breakdown()
+    report = {
+        "imports": {"total_ms": imports["total_ms"],
+                    "packages": dict(list(imports["packages"].items())[:args.top])},
+        "startup": {
+            "cold": startup_timing(args.db, warmup=False),
+            "warmup": startup_timing(args.db, warmup=True),
+        },
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the ConceptMap hot path
+Runs against a synthetic fixture database of configurable size and writes
+machine-readable JSON results
+
+    python tests/benchmark_conceptmap.py --size 5000 --output bench.json
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import argparse
+import json
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from app.codes import code_key
+
+
+def build_fixture_db(db_path: str, size: int, targets_per_code: int = 3, seed: int = 11):
+    """Create nam, icd11 and concept_map tables shaped like the real database.
+
+    ``size`` is the number of NAMASTE source codes; every other code carries a
+    bracketed suffix such as ``SR10 (AAA-10)`` to exercise prefix matching.
+    """
+    from create_concept_map import create_concept_map_table
+
+    rng = random.Random(seed)
+    words = ["vata", "pitta", "kapha", "jwara", "kasa", "shotha", "disorder", "pattern", "fever", "pain"]
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    cur.execute("CREATE TABLE nam (namc_code TEXT, namc_term TEXT, name_english TEXT, long_definition TEXT)")
+    cur.execute("CREATE TABLE icd11 (code TEXT, title TEXT)")
+
+    source_codes = [f"SR{n}" if n % 2 else f"SR{n} (AAA-{n})" for n in range(size)]
+    target_codes = [f"TM{n}" for n in range(size)]
+    cur.executemany("INSERT INTO nam VALUES (?, ?, ?, ?)", [
+        (code, " ".join(rng.sample(words, 3)), " ".join(rng.sample(words, 2)), " ".join(rng.choices(words, k=30)))
+        for code in source_codes
+    ])
+    cur.executemany("INSERT INTO icd11 VALUES (?, ?)", [
+        (code, " ".join(rng.sample(words, 4)).capitalize() + " (TM2)") for code in target_codes
+    ])
+    cur.execute("CREATE INDEX idx_nam_namc_code ON nam (namc_code)")
+    cur.execute("CREATE INDEX idx_icd11_code ON icd11 (code)")
+    conn.commit()
+    conn.close()
+
+    create_concept_map_table(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("""
+        INSERT INTO concept_map (source_system, source_code, target_system, target_code, equivalence, source_key)
+        VALUES ('NAMASTE', ?, 'ICD11', ?, ?, ?)
+    """, [
+        (source, rng.choice(target_codes), "equivalent" if t == 0 else "relatedto", code_key(source))
+        for source in source_codes
+        for t in range(targets_per_code)
+    ])
+    conn.commit()
+    conn.close()
+    return source_codes, target_codes
+
+
+def measure(func, args_list, iterations: int, repeat: int) -> dict:
+    """Time ``func`` over ``args_list`` cycled ``iterations`` times, ``repeat`` rounds"""
+    calls = [args_list[i % len(args_list)] for i in range(iterations)]
+    per_call = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for args in calls:
+            func(*args)
+        per_call.append((time.perf_counter_ns() - start) / iterations / 1000)
+    median = statistics.median(per_call)
+    return {
+        "calls": iterations * repeat,
+        "min_us": round(min(per_call), 3),
+        "median_us": round(median, 3),
+        "mean_us": round(statistics.fmean(per_call), 3),
+        "ops_per_sec": round(1e6 / median, 1) if median else None,
+    }
+
+
+def run_benchmarks(size: int, iterations: int, repeat: int, targets_per_code: int, seed: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix="conceptmap-bench-")
+    try:
+        return _run_benchmarks(os.path.join(workdir, "fixture.db"), size, iterations, repeat, targets_per_code, seed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run_benchmarks(db_path: str, size: int, iterations: int, repeat: int, targets_per_code: int, seed: int) -> dict:
+    source_codes, target_codes = build_fixture_db(db_path, size, targets_per_code, seed)
+
+    # app.config reads the database path at import time
+    os.environ["TERMINOLOGY_DB_PATH"] = db_path
+    from app import conceptmap, snapshot
+    from app.codes import normalize_code
+
+    rng = random.Random(seed)
+    hits = rng.sample(source_codes, min(len(source_codes), 200))
+    variants = [code.split(" (")[0] for code in hits if " (" in code] or hits
+    misses = [f"ZZ{n}" for n in range(50)]
+    spaced = [f"  {code.replace(' (', '   (')} " for code in hits]
+    terms = [(code,) for code in hits]
+    titles = [(code,) for code in rng.sample(target_codes, min(len(target_codes), 200))]
+
+    widest = max(hits, key=lambda code: len(conceptmap.fetch_concept_map_with_displays(code)))
+    rows = conceptmap.fetch_concept_map_with_displays(widest)
+    date = "2025-01-01"
+    model = conceptmap._concept_map_model(widest, rows, date)
+    serialized = model.dict()
+    emitted = conceptmap._emit_concept_map(widest, rows, date)
+
+    cases = {
+        "normalize_code": (normalize_code, [(code,) for code in spaced]),
+        "fetch_concept_map[hit]": (conceptmap.fetch_concept_map, [(code,) for code in hits]),
+        "fetch_concept_map[variant]": (conceptmap.fetch_concept_map, [(code,) for code in variants]),
+        "fetch_concept_map[miss]": (conceptmap.fetch_concept_map, [(code,) for code in misses]),
+        "fetch_concept_map_with_displays": (conceptmap.fetch_concept_map_with_displays, [(code,) for code in hits]),
+        "fetch_namaste_term": (conceptmap.fetch_namaste_term, terms),
+        "fetch_icd11_title": (conceptmap.fetch_icd11_title, titles),
+        "build_model[model_construction]": (conceptmap._concept_map_model, [(widest, rows, date)]),
+        "build_model[dict]": (model.dict, [()]),
+        "replace_relationship_with_equivalence": (conceptmap._replace_relationship_with_equivalence, [(serialized,)]),
+        "build_concept_map_model": (conceptmap._build_concept_map_model, [(widest, rows, date)]),
+        "emit_concept_map": (conceptmap._emit_concept_map, [(widest, rows, date)]),
+        "serialize_resource": (conceptmap.serialize_resource, [(emitted,)]),
+    }
+    results = []
+    for name, (func, args_list) in cases.items():
+        results.append({"name": name, **measure(func, args_list, iterations, repeat)})
+
+    # The same lookups served from the in-memory snapshot
+    snapshot.reload(db_path)
+    try:
+        for name in ("fetch_concept_map[hit]", "fetch_concept_map[variant]", "fetch_concept_map[miss]",
+                     "fetch_concept_map_with_displays", "fetch_namaste_term", "fetch_icd11_title"):
+            func, args_list = cases[name]
+            results.append({"name": f"{name}[snapshot]", **measure(func, args_list, iterations, repeat)})
+    finally:
+        snapshot.stop()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "size": size,
+            "targets_per_code": targets_per_code,
+            "mappings": size * targets_per_code,
+            "widest_code_rows": len(rows),
+            "iterations": iterations,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ConceptMap microbenchmarks on a synthetic database")
+    parser.add_argument("--size", type=int, default=2000, help="NAMASTE source codes in the fixture")
+    parser.add_argument("--targets-per-code", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=2000, help="calls per timed round")
+    parser.add_argument("--repeat", type=int, default=5, help="timed rounds per benchmark")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.size, args.iterations, args.repeat, args.targets_per_code, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,13 @@ Tests the FHIR ConceptMap endpoints and functionality
 import pytest
 import sys
 import os
+import base64
+import json
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from fastapi.testclient import TestClient
 from app.main import app
+from app import codesystem, conceptmap
 
 client = TestClient(app)
 
@@ -27,6 +30,38 @@ class TestConceptMapAPI:
         assert "endpoints" in data
         assert "/ConceptMap" in data["endpoints"]["concept_maps"]
     
+    def test_health_endpoint(self):
+        """Test the health endpoint reports connection pool statistics"""
+        response = client.get("/health")
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["status"] == "ok"
+        for key in ("max_size", "open", "in_use", "idle", "checkouts"):
+            assert key in data["database"]
+    
+    def test_metrics_endpoint(self):
+        """Test Prometheus metrics for routes, fetch helpers, serialization and caches"""
+        list_response = client.get("/ConceptMap")
+        test_code = list_response.json()["available_codes"][0]
+        conceptmap.response_cache.clear()
+        client.get(f"/ConceptMap/{test_code}")
+        client.get(f"/ConceptMap/{test_code}")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+
+        # Route latency is labelled by template, never by raw code
+        assert 'terminology_http_request_duration_seconds_count{method="GET",route="/ConceptMap/{source_code}"}' in text
+        assert f'route="/ConceptMap/{test_code}"' not in text
+        assert 'terminology_http_requests_total{method="GET",route="/ConceptMap",status="200"}' in text
+        assert 'terminology_db_query_duration_seconds_count{helper=' in text
+        assert 'terminology_fhir_serialization_duration_seconds_bucket{stage=' in text
+        assert 'terminology_db_connections{state="open"}' in text
+        assert 'terminology_cache_hit_ratio{cache="response"}' in text
+
     def test_list_concept_maps(self):
         """Test listing all available concept mappings"""
         response = client.get("/ConceptMap")
@@ -40,6 +75,34 @@ class TestConceptMapAPI:
         assert isinstance(data["available_codes"], list)
         assert len(data["available_codes"]) > 0
     
+    def test_list_concept_maps_pagination(self):
+        """Test keyset pagination of the concept map listing"""
+        full = client.get("/ConceptMap").json()
+
+        collected = []
+        url = "/ConceptMap?_count=7"
+        while url:
+            page = client.get(url).json()
+            assert len(page["available_codes"]) <= 7
+            assert page["total"] == full["total"]
+            collected.extend(page["available_codes"])
+            next_links = [link["url"] for link in page["link"] if link["relation"] == "next"]
+            url = next_links[0] if next_links else None
+
+        assert collected == full["available_codes"], "Pages should cover every code exactly once"
+
+    def test_list_concept_maps_ndjson(self):
+        """Test the NDJSON streaming variant of the listing"""
+        import json
+
+        full = client.get("/ConceptMap").json()
+        response = client.get("/ConceptMap?_format=ndjson")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        streamed = [json.loads(line)["code"] for line in response.text.splitlines()]
+        assert streamed == full["available_codes"]
+    
     def test_get_concept_map_success(self):
         """Test retrieving a valid concept map"""
         # First get available codes
@@ -122,6 +185,294 @@ class TestConceptMapAPI:
                     ]
                     assert target["relationship"] in valid_relationships
     
+    def test_etag_revalidation(self):
+        """Test that ConceptMap responses carry an ETag and honour If-None-Match"""
+        list_response = client.get("/ConceptMap")
+        test_code = list_response.json()["available_codes"][0]
+
+        response = client.get(f"/ConceptMap/{test_code}")
+        assert response.status_code == 200
+        etag = response.headers.get("etag")
+        assert etag and etag.startswith('"'), "Should return a strong ETag"
+
+        revalidated = client.get(f"/ConceptMap/{test_code}", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == etag
+        assert revalidated.content == b""
+
+        stale = client.get(f"/ConceptMap/{test_code}", headers={"If-None-Match": '"stale"'})
+        assert stale.status_code == 200
+        assert stale.content == response.content
+
+    def test_gzip_negotiation(self):
+        """Test that precompressed bodies are sent only when gzip is accepted"""
+        identity = client.get("/ConceptMap", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in identity.headers
+        assert identity.headers["vary"] == "Accept-Encoding"
+
+        compressed = client.get("/ConceptMap", headers={"Accept-Encoding": "gzip"})
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.content == identity.content
+        assert compressed.num_bytes_downloaded < len(identity.content)
+
+        refused = client.get("/ConceptMap", headers={"Accept-Encoding": "gzip;q=0, br"})
+        assert "content-encoding" not in refused.headers
+
+        # Each encoding carries its own ETag and either revalidates
+        test_code = identity.json()["available_codes"][0]
+        plain = client.get(f"/ConceptMap/{test_code}", headers={"Accept-Encoding": "identity"})
+        packed = client.get(f"/ConceptMap/{test_code}", headers={"Accept-Encoding": "gzip"})
+        if packed.headers.get("content-encoding") == "gzip":
+            assert packed.headers["etag"] != plain.headers["etag"]
+            assert packed.content == plain.content
+        for etag in (plain.headers["etag"], packed.headers["etag"]):
+            assert client.get(f"/ConceptMap/{test_code}", headers={"If-None-Match": etag}).status_code == 304
+
+    def test_stage_profiling(self, monkeypatch, tmp_path):
+        """Test opt-in per-request stage timing on the ConceptMap route"""
+        from app import config
+        list_response = client.get("/ConceptMap")
+        test_code = list_response.json()["available_codes"][0]
+        plain = client.get(f"/ConceptMap/{test_code}")
+
+        # Ignored unless enabled by configuration
+        monkeypatch.setattr(config, "PROFILING_ENABLED", False)
+        response = client.get(f"/ConceptMap/{test_code}", headers={"X-Profile": "1"})
+        assert "server-timing" not in response.headers
+
+        monkeypatch.setattr(config, "PROFILING_ENABLED", True)
+        monkeypatch.setattr(config, "CONCEPTMAP_VALIDATE", True)
+        response = client.get(f"/ConceptMap/{test_code}", params={"_profile": "1"})
+        assert response.status_code == 200
+        assert response.json() == plain.json()
+        timing = response.headers["server-timing"]
+        for stage in ("normalize_code", "fetch_concept_map", "display_lookups",
+                      "model_construction", "model_dict", "relationship_rewrite", "serialize"):
+            assert f"{stage};dur=" in timing, f"Missing stage {stage}: {timing}"
+
+        # cProfile dump on request
+        monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path))
+        response = client.get(f"/ConceptMap/{test_code}", headers={"X-Profile": "cprofile"})
+        dump = response.headers["x-profile-dump"]
+        assert os.path.exists(dump) and dump.startswith(str(tmp_path))
+
+        assert client.get("/ConceptMap/INVALID_CODE_123", params={"_profile": "1"}).status_code == 404
+
+    def test_response_cache(self):
+        """Test that repeat lookups are served from the LRU response cache"""
+        list_response = client.get("/ConceptMap")
+        test_code = list_response.json()["available_codes"][-1]
+
+        client.get(f"/ConceptMap/{test_code}")
+        hits_before = conceptmap.response_cache.stats()["hits"]
+        response = client.get(f"/ConceptMap/{test_code}")
+        assert response.status_code == 200
+        assert conceptmap.response_cache.stats()["hits"] == hits_before + 1
+
+        # Misses are not cached and still return 404
+        assert client.get("/ConceptMap/INVALID_CODE_123").status_code == 404
+
+    def test_startup_warmup(self):
+        """Test warmup opens connections and pre-renders ConceptMaps served as cache hits"""
+        from app.profiling import StageTimer
+        from app.warmup import warmup
+
+        conceptmap.response_cache.clear()
+        timer = StageTimer()
+        summary = warmup(timer, cache_codes=5)
+        assert summary["connections"] >= 1
+        assert summary["cached_concept_maps"] == 5
+        assert {"warmup.connections", "warmup.statements", "warmup.response_cache"} <= set(timer.stages)
+
+        test_code = client.get("/ConceptMap").json()["available_codes"][0]
+        hits_before = conceptmap.response_cache.stats()["hits"]
+        assert client.get(f"/ConceptMap/{test_code}").status_code == 200
+        assert conceptmap.response_cache.stats()["hits"] == hits_before + 1
+
+        assert "imports" in client.get("/health").json()["startup_ms"]
+
+    def test_batch_translate(self):
+        """Test translating several codes in one request"""
+        list_response = client.get("/ConceptMap")
+        available_codes = list_response.json()["available_codes"]
+        codes = available_codes[:3] + ["INVALID_CODE_123"]
+
+        response = client.post("/ConceptMap/$translate", json={"codes": codes})
+        assert response.status_code == 200
+
+        bundle = response.json()
+        assert bundle["resourceType"] == "Bundle"
+        assert bundle["type"] == "batch-response"
+        assert len(bundle["entry"]) == len(codes)
+
+        for code, entry in zip(codes[:3], bundle["entry"][:3]):
+            assert entry["response"]["status"] == "200 OK"
+            single = client.get(f"/ConceptMap/{code}").json()
+            assert entry["resource"] == single, f"Batch result should match GET for {code}"
+
+        missing = bundle["entry"][-1]
+        assert missing["response"]["status"] == "404 Not Found"
+        assert missing["response"]["outcome"]["resourceType"] == "OperationOutcome"
+
+    def test_batch_translate_parameters(self):
+        """Test that $translate accepts a FHIR Parameters resource"""
+        list_response = client.get("/ConceptMap")
+        code = list_response.json()["available_codes"][0]
+
+        response = client.post("/ConceptMap/$translate", json={
+            "resourceType": "Parameters",
+            "parameter": [{"name": "code", "valueCode": code}]
+        })
+        assert response.status_code == 200
+        assert response.json()["entry"][0]["resource"]["resourceType"] == "ConceptMap"
+
+        assert client.post("/ConceptMap/$translate", json={"codes": []}).status_code == 400
+        for parameter in (["x"], [None], {"name": "code", "valueCode": code}, "code"):
+            malformed = client.post("/ConceptMap/$translate", json={"resourceType": "Parameters", "parameter": parameter})
+            assert malformed.status_code == 400, f"parameter={parameter!r} should be rejected"
+
+    def test_reverse_translate(self):
+        """Test ICD-11 -> NAMASTE translation as a FHIR Parameters resource"""
+        import sqlite3
+        conn = sqlite3.connect("db/ayush_icd11_combined.db")
+        cur = conn.cursor()
+        cur.execute("SELECT target_code FROM concept_map LIMIT 1")
+        target_code = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM concept_map WHERE target_code = ?", (target_code,))
+        expected = cur.fetchone()[0]
+        conn.close()
+
+        response = client.get("/ConceptMap/$translate", params={
+            "code": target_code, "system": "http://id.who.int/icd/release/11/mms", "reverse": "true"
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data["resourceType"] == "Parameters"
+        assert data["parameter"][0] == {"name": "result", "valueBoolean": True}
+        matches = [p for p in data["parameter"] if p["name"] == "match"]
+        assert len(matches) == expected
+        for match in matches:
+            parts = {part["name"]: part for part in match["part"]}
+            assert parts["concept"]["valueCoding"]["system"] == "http://namaste.terminology/CodeSystem"
+
+        missing = client.get("/ConceptMap/$translate", params={"code": "INVALID_CODE_123", "reverse": "true"})
+        assert missing.status_code == 200
+        assert missing.json()["parameter"][0]["valueBoolean"] is False
+
+        wrong_system = client.get("/ConceptMap/$translate", params={
+            "code": target_code, "system": "http://namaste.terminology/CodeSystem", "reverse": "true"
+        })
+        assert wrong_system.status_code == 400
+
+    def test_codesystem_lookup(self):
+        """Test CodeSystem $lookup for NAMASTE and ICD-11 codes"""
+        import sqlite3
+        conn = sqlite3.connect("db/ayush_icd11_combined.db")
+        cur = conn.cursor()
+        cur.execute("SELECT namc_code, namc_term FROM nam WHERE namc_code IS NOT NULL LIMIT 1")
+        namc_code, namc_term = cur.fetchone()
+        cur.execute("SELECT code, title FROM icd11 WHERE code IS NOT NULL LIMIT 1")
+        icd_code, icd_title = cur.fetchone()
+        conn.close()
+
+        cases = [
+            ("http://namaste.terminology/CodeSystem", namc_code, namc_term),
+            ("http://id.who.int/icd/release/11/mms", icd_code, icd_title),
+        ]
+        for system, code, display in cases:
+            response = client.get("/CodeSystem/$lookup", params={"system": system, "code": code})
+            assert response.status_code == 200
+            data = response.json()
+            assert data["resourceType"] == "Parameters"
+            values = {p["name"]: p for p in data["parameter"]}
+            assert values["display"]["valueString"] == display
+
+            # Repeat lookups come from the shared result cache
+            hits_before = codesystem.lookup_cache.stats()["hits"]
+            cached = client.get("/CodeSystem/$lookup", params={"system": system, "code": code})
+            assert cached.content == response.content
+            assert codesystem.lookup_cache.stats()["hits"] == hits_before + 1
+
+        missing = client.get("/CodeSystem/$lookup", params={
+            "system": "http://id.who.int/icd/release/11/mms", "code": "INVALID_CODE_123"
+        })
+        assert missing.status_code == 404
+
+        unknown = client.get("/CodeSystem/$lookup", params={"system": "http://example.org", "code": "X"})
+        assert unknown.status_code == 400
+
+    def test_valueset_expand(self):
+        """Test type-ahead completions from the in-memory prefix index"""
+        import sqlite3
+        conn = sqlite3.connect("db/ayush_icd11_combined.db")
+        cur = conn.cursor()
+        cur.execute("SELECT namc_code, namc_term FROM nam WHERE namc_code IS NOT NULL LIMIT 1")
+        namc_code, namc_term = cur.fetchone()
+        cur.execute("SELECT code, title FROM icd11 WHERE code IS NOT NULL AND title IS NOT NULL LIMIT 1")
+        icd_code, icd_title = cur.fetchone()
+        conn.close()
+
+        # An exact code ranks first
+        response = client.get("/ValueSet/$expand", params={"filter": namc_code})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["resourceType"] == "ValueSet"
+        assert data["expansion"]["contains"][0]["code"] == namc_code
+
+        # Partial titles match case-insensitively, restricted to one system
+        prefix = icd_title.split()[0][:3].lower()
+        response = client.get("/ValueSet/$expand", params={
+            "filter": prefix, "system": "http://id.who.int/icd/release/11/mms", "count": 5
+        })
+        contains = response.json()["expansion"]["contains"]
+        assert 0 < len(contains) <= 5
+        assert all(c["system"] == "http://id.who.int/icd/release/11/mms" for c in contains)
+
+        missing = client.get("/ValueSet/$expand", params={"filter": "zzzzqqqq"})
+        assert missing.json()["expansion"]["contains"] == []
+
+        unknown = client.get("/ValueSet/$expand", params={"filter": "a", "system": "http://example.org"})
+        assert unknown.status_code == 400
+
+    def test_search(self):
+        """Test ranked full-text search with snippets and keyset pagination"""
+        import sqlite3
+        conn = sqlite3.connect("db/ayush_icd11_combined.db")
+        title = conn.execute("SELECT title FROM icd11 WHERE title IS NOT NULL LIMIT 1").fetchone()[0]
+        conn.close()
+        word = title.split()[0]
+
+        response = client.get("/search", params={"q": word, "index": "icd11"})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results, f"Expected matches for '{word}'"
+        assert all("<mark>" in result["snippet"] for result in results)
+        scores = [result["score"] for result in results]
+        assert scores == sorted(scores, reverse=True), "Results should be ranked by bm25()"
+
+        # Walking the pages returns the same results as one large page
+        full = client.get("/search", params={"q": word, "_count": 100}).json()["results"]
+        collected = []
+        url = f"/search?q={word}&_count=3"
+        while url and len(collected) < len(full):
+            page = client.get(url).json()
+            assert len(page["results"]) <= 3
+            collected.extend(page["results"])
+            next_links = [link["url"] for link in page["link"] if link["relation"] == "next"]
+            url = next_links[0] if next_links else None
+        assert collected == full[:len(collected)] and len(collected) == len(full)
+
+        # FTS5 syntax in user input is neutralized rather than raising errors
+        for text in ['"unbalanced', "NEAR(a b", "title:*", "a OR -b"]:
+            assert client.get("/search", params={"q": text}).status_code == 200
+        assert client.get("/search", params={"q": "()"}).status_code == 400
+        assert client.get("/search", params={"q": word, "cursor": "garbage"}).status_code == 400
+        for values in ([1, 1, 2 ** 70], [1, -(2 ** 64), 1], ["NaN", 0, 1], [1e400, 0, 1]):
+            forged = base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+            assert client.get("/search", params={"q": word, "cursor": forged}).status_code == 400, values
+        assert client.get("/search", params={"q": "fever", "cursor": "WzEsIDEsIDk5OTk5OTk5OTk5OTk5OTk5OTk5OTk5XQ"}) \
+            .status_code == 400
+
     def test_url_encoding_handling(self):
         """Test that URL-encoded codes are handled properly"""
         # Test with a code that has special characters (parentheses)
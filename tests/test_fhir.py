@@ -7,8 +7,20 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import gzip
 import json
-from app.conceptmap import get_concept_map, list_all_concept_maps
+import shutil
+import sqlite3
+import tempfile
+import time
+from app import config, db, snapshot
+from app.compression import EncodedBody
+from app.conceptmap import (
+    CONCEPT_MAP_VERSION, fetch_rendered_concept_map, get_concept_map, list_all_concept_maps,
+    serialize_resource
+)
+
+DB_PATH = "db/ayush_icd11_combined.db"
 
 class TestFHIRCompliance:
     """Test FHIR R4 ConceptMap compliance"""
@@ -111,6 +123,115 @@ class TestFHIRCompliance:
         parsed = json.loads(json_str)
         assert parsed["resourceType"] == "ConceptMap", "JSON round-trip should work"
     
+    def test_fast_path_matches_model_path(self):
+        """Test that the fast serializer emits exactly what the FHIR models emit"""
+        bundle = list_all_concept_maps()
+        codes = bundle["available_codes"]
+        # Bare codes also exercise multi-element maps built from bracketed variants
+        codes = codes + sorted({code.split(" (")[0] for code in codes if " (" in code})
+
+        for code in codes:
+            validated = get_concept_map(code, validate=True)
+            fast = get_concept_map(code, validate=False)
+            assert json.dumps(fast) == json.dumps(validated), \
+                f"Fast path output differs from validated output for {code}"
+    
+    def test_materialized_concept_maps(self):
+        """Test that pre-rendered ConceptMaps match freshly built resources"""
+        conn = sqlite3.connect(DB_PATH)
+        cur = conn.cursor()
+        cur.execute("SELECT lookup_code FROM concept_map_rendered")
+        lookup_codes = [row[0] for row in cur.fetchall()]
+        conn.close()
+
+        bundle = list_all_concept_maps()
+        assert set(bundle["available_codes"]) <= set(lookup_codes), \
+            "Every listed code should be pre-rendered"
+
+        for code in lookup_codes:
+            body = fetch_rendered_concept_map(code)
+            assert body is not None, f"Missing pre-rendered body for {code}"
+            assert json.loads(body) == json.loads(serialize_resource(get_concept_map(code))), \
+                f"Pre-rendered ConceptMap differs for {code}"
+    
+    def test_concept_map_date_ignores_file_mtime(self):
+        """Test that ConceptMaps built on request carry the pre-rendered release date"""
+        with tempfile.TemporaryDirectory() as workdir:
+            db_copy = os.path.join(workdir, "terminology.db")
+            shutil.copy(DB_PATH, db_copy)
+            # A file last written days before the ConceptMaps were rendered
+            stale = time.time() - 3 * 86400
+            os.utime(db_copy, (stale, stale))
+
+            conn = sqlite3.connect(db_copy)
+            code, body = conn.execute("SELECT lookup_code, body FROM concept_map_rendered LIMIT 1").fetchone()
+            release_date = db.release_dates(conn)[CONCEPT_MAP_VERSION]
+            conn.close()
+            assert json.loads(body)["date"] == release_date
+            assert db.version_date(db.file_signature(db_copy)) != release_date
+
+            snapshot.start(db_copy, interval=0)
+            try:
+                assert get_concept_map(code)["date"] == release_date
+            finally:
+                snapshot.stop()
+
+    def test_rendered_table_detected_after_regeneration(self):
+        """Test the pre-rendered fast path follows a database regenerated while serving"""
+        with tempfile.TemporaryDirectory() as workdir:
+            db_copy = os.path.join(workdir, "terminology.db")
+            shutil.copy(DB_PATH, db_copy)
+            conn = sqlite3.connect(db_copy)
+            code = conn.execute("SELECT lookup_code FROM concept_map_rendered LIMIT 1").fetchone()[0]
+            conn.execute("ALTER TABLE concept_map_rendered RENAME TO concept_map_rendered_pending")
+            conn.commit()
+
+            saved_path, saved_pool = config.DB_PATH, db._pool
+            config.DB_PATH, db._pool = db_copy, None
+            try:
+                assert fetch_rendered_concept_map(code) is None
+                # render_concept_maps finishing on the live database
+                conn.execute("ALTER TABLE concept_map_rendered_pending RENAME TO concept_map_rendered")
+                conn.commit()
+                stat = os.stat(db_copy)
+                os.utime(db_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+                assert fetch_rendered_concept_map(code) is not None, \
+                    "Pre-rendered bodies should be served without a restart"
+            finally:
+                conn.close()
+                db.get_pool().close_idle()
+                config.DB_PATH, db._pool = saved_path, saved_pool
+
+    def test_gzip_payload_savings(self):
+        """Measure gzip byte savings and CPU cost on representative payloads"""
+        conn = sqlite3.connect(DB_PATH)
+        cur = conn.cursor()
+        # The ConceptMap with the most targets, plus the full listing page
+        cur.execute("SELECT source_key FROM concept_map GROUP BY source_key ORDER BY COUNT(*) DESC LIMIT 1")
+        widest_code = cur.fetchone()[0]
+        conn.close()
+
+        payloads = {
+            f"ConceptMap/{widest_code}": serialize_resource(get_concept_map(widest_code)),
+            "ConceptMap listing": serialize_resource(list_all_concept_maps()),
+        }
+        rounds = 20
+        for name, body in payloads.items():
+            start = time.perf_counter()
+            for _ in range(rounds):
+                encoded = EncodedBody.build(body)
+            compress_ms = (time.perf_counter() - start) * 1000 / rounds
+
+            assert encoded.gzip is not None, f"{name} should be stored compressed"
+            assert gzip.decompress(encoded.gzip) == body
+            ratio = len(encoded.gzip) / len(body)
+            print(f"  {name}: {len(body):,} -> {len(encoded.gzip):,} bytes "
+                  f"({ratio:.0%}), {compress_ms:.3f} ms to compress once")
+            assert ratio < 0.5, f"{name} should compress well, got {ratio:.0%}"
+
+        # Tiny bodies are not worth a gzip copy
+        assert EncodedBody.build(b'{"resourceType":"Parameters"}').gzip is None
+
     def test_bundle_structure(self):
         """Test that Bundle response follows FHIR specification"""
         bundle = list_all_concept_maps()
@@ -154,6 +275,11 @@ def run_fhir_tests():
         ("Group Structure", test_class.test_fhir_group_structure),
         ("Element Structure", test_class.test_fhir_element_structure),
         ("JSON Serialization", test_class.test_fhir_json_serialization),
+        ("Fast Path Equivalence", test_class.test_fast_path_matches_model_path),
+        ("Materialized ConceptMaps", test_class.test_materialized_concept_maps),
+        ("ConceptMap Date", test_class.test_concept_map_date_ignores_file_mtime),
+        ("Rendered Table Regeneration", test_class.test_rendered_table_detected_after_regeneration),
+        ("Gzip Payload Savings", test_class.test_gzip_payload_savings),
         ("Bundle Structure", test_class.test_bundle_structure),
         ("Terminology Service", test_class.test_terminology_service_compliance),
     ]
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the HTTP load-test harness (scripts/load_benchmark.py)
+Covers the code mix and regression gate without starting a server
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from app.conceptmap import fetch_concept_map
+from load_benchmark import build_code_mix, check_regression, compare_to_baseline, machine_profile, percentile
+
+DB_PATH = "db/ayush_icd11_combined.db"
+
+
+class TestLoadHarness:
+    """Test the load-test harness building blocks"""
+
+    def test_code_mix_labels(self):
+        """Hits and variants resolve, misses do not"""
+        mix = build_code_mix(DB_PATH, size=300)
+        kinds = {kind for kind, _ in mix}
+        assert {"hit", "miss"} <= kinds
+        for kind, code in set(mix):
+            found = bool(fetch_concept_map(code))
+            assert found == (kind != "miss"), f"{kind} code '{code}' resolved={found}"
+
+    def test_percentile(self):
+        values = [float(n) for n in range(1, 101)]
+        assert percentile(values, 0.50) == 50.0
+        assert percentile(values, 0.95) == 95.0
+        assert percentile(values, 0.99) == 99.0
+        assert percentile([], 0.99) == 0.0
+
+    def test_regression_gate(self):
+        baseline = {"throughput_rps": 200.0, "p50_ms": 10.0, "p95_ms": 40.0, "p99_ms": 80.0}
+        steady = {"throughput_rps": 190.0, "p95_ms": 45.0, "p99_ms": 90.0, "errors": 0}
+        assert check_regression(steady, baseline, tolerance=0.3) == []
+
+        slower = dict(steady, throughput_rps=120.0, p99_ms=200.0)
+        failures = check_regression(slower, baseline, tolerance=0.3)
+        assert len(failures) == 2
+        assert check_regression(dict(steady, errors=3), baseline, tolerance=0.3)
+
+    def test_baseline_machine(self):
+        """Baselines only gate runs on the machine that recorded them"""
+        baseline = {"throughput_rps": 200.0, "p50_ms": 10.0, "p95_ms": 40.0, "p99_ms": 80.0}
+        slower = {"throughput_rps": 100.0, "p95_ms": 45.0, "p99_ms": 90.0, "errors": 0}
+        failures, enforced = compare_to_baseline(slower, dict(baseline, machine=machine_profile()), tolerance=0.3)
+        assert failures and enforced
+        other = dict(machine_profile(), cpus=(machine_profile()["cpus"] or 1) + 64)
+        failures, enforced = compare_to_baseline(slower, dict(baseline, machine=other), tolerance=0.3)
+        assert failures and not enforced
+        assert not compare_to_baseline(slower, baseline, tolerance=0.3)[1]
+        assert compare_to_baseline(slower, dict(baseline, machine=other), tolerance=0.3, enforce=True)[1]
+        assert compare_to_baseline(slower, baseline, tolerance=0.3, enforce=True)[1]
+        newer_python = dict(machine_profile(), python="9.9.9")
+        assert compare_to_baseline(slower, dict(baseline, machine=newer_python), tolerance=0.3)[1], \
+            "The Python patch level should not switch the gate off"
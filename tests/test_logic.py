@@ -6,9 +6,18 @@ Tests the core functionality without HTTP layer
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
 
+import asyncio
 import sqlite3
-from app.conceptmap import fetch_concept_map, fetch_namaste_term, fetch_icd11_title
+import time
+from app.conceptmap import (
+    fetch_concept_map, fetch_concept_map_with_displays, fetch_concept_maps_bulk,
+    fetch_namaste_term, fetch_icd11_title, fetch_reverse_concept_map
+)
+from app import db, snapshot
+from app.cache import LRUCache
+from app.codes import code_key, normalize_code
 
 DB_PATH = "db/ayush_icd11_combined.db"
 
@@ -85,6 +94,45 @@ class TestConceptMapLogic:
         invalid_result = fetch_concept_map("INVALID_CODE_XYZ")
         assert len(invalid_result) == 0, "Should return empty list for invalid code"
     
+    def test_batched_display_resolution(self):
+        """Test that the joined display lookup matches the per-code helpers"""
+        conn = sqlite3.connect(DB_PATH)
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT source_code FROM concept_map
+            GROUP BY source_code ORDER BY COUNT(*) DESC LIMIT 1
+        """)
+        code = cur.fetchone()[0]
+        conn.close()
+
+        rows = fetch_concept_map_with_displays(code)
+        assert len(rows) == len(fetch_concept_map(code)), "Should return one row per mapping"
+
+        for source_code, target_code, equivalence, namaste_term, icd11_title in rows:
+            assert namaste_term == fetch_namaste_term(source_code)
+            assert icd11_title == fetch_icd11_title(target_code)
+
+        assert fetch_concept_map_with_displays("INVALID_CODE_XYZ") == []
+
+    def test_bulk_resolution(self):
+        """Test that set-based bulk resolution matches per-code lookups"""
+        conn = sqlite3.connect(DB_PATH)
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT source_code FROM concept_map")
+        codes = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT DISTINCT target_code FROM concept_map")
+        targets = [row[0] for row in cur.fetchall()]
+        conn.close()
+
+        codes += [code.split(" (")[0] for code in codes if " (" in code]
+        codes += ["INVALID_CODE_XYZ"]
+        resolved = fetch_concept_maps_bulk(codes)
+        for code in codes:
+            assert resolved[code] == fetch_concept_map_with_displays(code), \
+                f"Bulk resolution mismatch for code: {code}"
+        resolved_targets = {row[1] for rows in resolved.values() for row in rows}
+        assert resolved_targets == set(targets), "Bulk resolution should reach every mapped target code"
+    
     def test_namaste_icd11_mapping_consistency(self):
         """Test that NAMASTE to ICD-11 mappings are consistent"""
         conn = sqlite3.connect(DB_PATH)
@@ -165,6 +213,605 @@ class TestConceptMapLogic:
         
         conn.close()
 
+    def test_source_key_index(self):
+        """Test that canonical source keys are filled and served by an index"""
+        conn = sqlite3.connect(DB_PATH)
+        cur = conn.cursor()
+
+        cur.execute("SELECT source_code, source_key FROM concept_map")
+        for source_code, source_key in cur.fetchall():
+            assert source_key == code_key(source_code), \
+                f"source_key mismatch for '{source_code}': '{source_key}'"
+
+        cur.execute("""
+            EXPLAIN QUERY PLAN
+            SELECT source_code, target_code, equivalence FROM concept_map
+            WHERE source_key = ? AND (source_code = ? OR source_code LIKE ? OR source_code LIKE ?)
+        """, ("SR10", "SR10", "SR10(%", "SR10 %"))
+        plan = " ".join(str(row[-1]) for row in cur.fetchall())
+        assert "idx_concept_map_source_key" in plan, f"Lookup should use the source_key index: {plan}"
+
+        conn.close()
+
+    def test_reverse_translation(self):
+        """Test ICD-11 -> NAMASTE lookups against the target_code index"""
+        conn = sqlite3.connect(DB_PATH)
+        cur = conn.cursor()
+        cur.execute("SELECT target_code FROM concept_map LIMIT 1")
+        target_code = cur.fetchone()[0]
+        cur.execute("SELECT source_code FROM concept_map WHERE target_code = ? ORDER BY id", (target_code,))
+        expected = [normalize_code(row[0]) for row in cur.fetchall()]
+
+        cur.execute("""
+            EXPLAIN QUERY PLAN
+            SELECT source_code, target_code, equivalence FROM concept_map WHERE target_code = ?
+        """, (target_code,))
+        plan = " ".join(str(row[-1]) for row in cur.fetchall())
+        assert "idx_concept_map_target_code" in plan, f"Reverse lookup should use the target_code index: {plan}"
+        conn.close()
+
+        rows = fetch_reverse_concept_map(target_code)
+        assert [row[0] for row in rows] == expected
+        assert all(row[1] == target_code for row in rows)
+        assert fetch_reverse_concept_map("INVALID_CODE_123") == []
+
+    def test_connection_pool_reuse(self):
+        """Test that fetch helpers reuse pooled read-only connections"""
+        conn = sqlite3.connect(DB_PATH)
+        cur = conn.cursor()
+        cur.execute("SELECT source_code, target_code FROM concept_map LIMIT 1")
+        source_code, target_code = cur.fetchone()
+        conn.close()
+
+        pool = db.get_pool()
+        for _ in range(5):
+            fetch_concept_map(source_code)
+            fetch_namaste_term(source_code)
+            fetch_icd11_title(target_code)
+
+        stats = pool.stats()
+        assert stats["open"] <= stats["max_size"], "Pool should never exceed its size"
+        assert stats["in_use"] == 0, "All connections should be returned to the pool"
+        assert stats["checkouts"] >= 15, "Every fetch should borrow a pooled connection"
+
+        # Pooled connections are read-only
+        with db.connection() as pooled:
+            try:
+                pooled.execute("DELETE FROM concept_map")
+                assert False, "Pooled connections must reject writes"
+            except sqlite3.OperationalError:
+                pass
+
+    def test_snapshot_matches_database(self):
+        """Test that snapshot lookups return the same rows as SQLite"""
+        conn = sqlite3.connect(DB_PATH)
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT source_code FROM concept_map")
+        codes = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT DISTINCT target_code FROM concept_map")
+        targets = [row[0] for row in cur.fetchall()]
+        conn.close()
+
+        # Also exercise bracket-less and lower-case variants of bracketed codes
+        variants = codes + [code.split(" (")[0] for code in codes if " (" in code]
+        variants += [code.lower() for code in codes[:10]] + ["INVALID_CODE_XYZ"]
+        expected = {code: fetch_concept_map_with_displays(code) for code in variants}
+        expected_reverse = {code: fetch_reverse_concept_map(code) for code in targets}
+
+        snapshot.reload(DB_PATH)
+        try:
+            for code in variants:
+                assert fetch_concept_map_with_displays(code) == expected[code], \
+                    f"Snapshot mismatch for code: {code}"
+            for code in targets:
+                assert fetch_reverse_concept_map(code) == expected_reverse[code], \
+                    f"Snapshot reverse mismatch for code: {code}"
+        finally:
+            snapshot.stop()
+        assert snapshot.current() is None, "Stopping should fall back to SQLite"
+
+    def test_snapshot_hot_reload(self):
+        """Test that a changed database file triggers an atomic snapshot swap"""
+        import shutil
+        import tempfile
+
+        def wait_for_reload(previous):
+            deadline = time.time() + 5
+            while snapshot.current() is previous and time.time() < deadline:
+                time.sleep(0.05)
+
+        # Touch a copy so the shared database keeps its mtime, and with it its ETags
+        with tempfile.TemporaryDirectory() as workdir:
+            db_copy = os.path.join(workdir, "terminology.db")
+            shutil.copy(DB_PATH, db_copy)
+            snapshot.start(db_copy, interval=0.05)
+            try:
+                first = snapshot.current()
+                os.utime(db_copy, ns=(time.time_ns(), os.stat(db_copy).st_mtime_ns + 10**9))
+                wait_for_reload(first)
+                assert snapshot.current() is not first, "Snapshot should be rebuilt after file change"
+                assert snapshot.current().row_count == first.row_count
+
+                # A failed rebuild keeps the previous snapshot and the watcher alive
+                second = snapshot.current()
+                original_load = snapshot.TerminologySnapshot.load
+                snapshot.TerminologySnapshot.load = classmethod(lambda cls, path: 1 / 0)
+                try:
+                    os.utime(db_copy, ns=(time.time_ns(), os.stat(db_copy).st_mtime_ns + 10**9))
+                    time.sleep(0.3)
+                    assert snapshot.current() is second
+                finally:
+                    snapshot.TerminologySnapshot.load = original_load
+                wait_for_reload(second)
+                assert snapshot.current() is not second, "Watcher should survive a failed reload"
+            finally:
+                snapshot.stop()
+
+    def test_lru_cache_eviction(self):
+        """Test that the response cache evicts least recently used entries"""
+        cache = LRUCache(max_entries=2, max_bytes=10)
+        cache.put("a", b"1234")
+        cache.put("b", b"1234")
+        assert cache.get("a") == b"1234"  # "a" is now most recently used
+        cache.put("c", b"1234")
+        assert cache.get("b") is None, "Least recently used entry should be evicted"
+        assert cache.get("a") is not None and cache.get("c") is not None
+
+        cache.put("d", b"12345678")  # Exceeds the byte budget with "a" and "c"
+        stats = cache.stats()
+        assert stats["bytes"] <= 10
+        assert stats["evictions"] == 3
+
+        cache.put("huge", b"x" * 11)
+        assert cache.get("huge") is None, "Oversized values should never be cached"
+
+    def test_metrics_overhead(self):
+        """Test that recording metrics stays cheap enough to leave on"""
+        from app import metrics
+
+        histogram = metrics.Histogram("test_latency_seconds", "Test histogram", ("helper",))
+        rounds = 20000
+        start = time.perf_counter()
+        for i in range(rounds):
+            histogram.observe(i * 1e-6, "fetch_concept_map")
+        per_observation = (time.perf_counter() - start) / rounds
+        assert histogram.count("fetch_concept_map") == rounds
+        assert per_observation < 20e-6, f"observe() took {per_observation * 1e6:.2f} us"
+
+        lines = list(histogram.render())
+        assert 'test_latency_seconds_bucket{helper="fetch_concept_map",le="+Inf"} 20000' in lines
+
+        # Decorated helpers record one observation per call
+        before = metrics.QUERY_LATENCY.count("fetch_concept_map")
+        fetch_concept_map("INVALID_CODE_123")
+        assert metrics.QUERY_LATENCY.count("fetch_concept_map") == before + 1
+
+    def test_microbenchmarks_run(self):
+        """Test that the microbenchmark suite runs and emits machine-readable results"""
+        import json
+        import subprocess
+        import tempfile
+
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_conceptmap.py")
+        with tempfile.TemporaryDirectory() as workdir:
+            output = os.path.join(workdir, "bench.json")
+            subprocess.run(
+                [sys.executable, script, "--size", "40", "--iterations", "20", "--repeat", "2", "--output", output],
+                check=True, timeout=120
+            )
+            with open(output) as f:
+                report = json.load(f)
+
+        assert report["meta"]["size"] == 40
+        names = {result["name"] for result in report["results"]}
+        for name in ("normalize_code", "fetch_concept_map[hit]", "fetch_namaste_term", "fetch_icd11_title",
+                     "build_model[model_construction]", "build_model[dict]",
+                     "replace_relationship_with_equivalence"):
+            assert name in names, f"Missing benchmark {name}"
+        assert all(result["median_us"] > 0 for result in report["results"])
+
+    def test_streaming_csv_ingestion(self):
+        """Test chunked CSV import fills the base table and FTS index chunk by chunk"""
+        import tempfile
+        from create_database import index_csv_to_sqlite
+
+        with tempfile.TemporaryDirectory() as workdir:
+            csv_path = os.path.join(workdir, "terms.csv")
+            db_path = os.path.join(workdir, "db", "terms.db")
+            with open(csv_path, "w") as f:
+                f.write("NAMC_CODE,NAMC_TERM,Sort Order\n")
+                for n in range(25):
+                    f.write(f"SR{n},{'vata' if n % 2 else 'pitta'} term {n},{'' if n == 7 else n}\n")
+
+            index_csv_to_sqlite(csv_path, db_path, "nam", fts_table_name="nam_fts",
+                                fts_columns=["namc_code", "namc_term"], index_columns=["namc_code"],
+                                chunksize=10)
+
+            conn = sqlite3.connect(db_path)
+            try:
+                assert conn.execute("SELECT count(*) FROM nam").fetchone()[0] == 25
+                assert conn.execute("SELECT sort_order FROM nam WHERE namc_code = 'SR7'").fetchone()[0] is None
+                assert conn.execute("SELECT typeof(sort_order) FROM nam WHERE namc_code = 'SR8'").fetchone()[0] \
+                    in ("integer", "real")
+                matched = conn.execute(
+                    "SELECT nam.namc_code FROM nam_fts JOIN nam ON nam.rowid = nam_fts.rowid "
+                    "WHERE nam_fts MATCH 'vata'").fetchall()
+                assert len(matched) == 12
+                assert all(int(code[2:]) % 2 for (code,) in matched)
+                conn.execute("INSERT INTO nam_fts(nam_fts) VALUES ('integrity-check')")
+                indexes = {row[1] for row in conn.execute("PRAGMA index_list('nam')")}
+                assert "idx_nam_namc_code" in indexes
+            finally:
+                conn.close()
+
+            # A later chunk of all-digit codes keeps them as written
+            with open(csv_path, "w") as f:
+                f.write("CODE,TITLE,Chapter No\n")
+                f.write("SR1,first,1\nSR2,second,2\n0000,zero,3\n0042,answer,4\n")
+            index_csv_to_sqlite(csv_path, db_path, "icd11", index_columns=["code"], chunksize=2)
+            conn = sqlite3.connect(db_path)
+            try:
+                assert [row[0] for row in conn.execute("SELECT code FROM icd11 ORDER BY rowid")] == \
+                    ["SR1", "SR2", "0000", "0042"]
+                assert {row[0] for row in conn.execute("SELECT typeof(chapter_no) FROM icd11")} == {"integer"}
+            finally:
+                conn.close()
+
+            # Column types do not depend on which chunk a value lands in
+            with open(csv_path, "w") as f:
+                f.write("Code,Alt Code,Title,Score\n")
+                f.write("0001,0001,a,1\n0002,0002,b,2\nSR1,0003,c,2.5\n")
+            stored = {}
+            for chunksize in (2, 100):
+                chunk_db = os.path.join(workdir, f"chunks-{chunksize}.db")
+                index_csv_to_sqlite(csv_path, chunk_db, "ast", index_columns=["alt_code"], chunksize=chunksize)
+                conn = sqlite3.connect(chunk_db)
+                try:
+                    stored[chunksize] = conn.execute(
+                        "SELECT code, typeof(code), alt_code, typeof(alt_code), score FROM ast ORDER BY rowid"
+                    ).fetchall()
+                finally:
+                    conn.close()
+            assert stored[2] == stored[100]
+            assert [row[:4] for row in stored[2]] == [
+                ("0001", "text", "0001", "text"), ("0002", "text", "0002", "text"), ("SR1", "text", "0003", "text"),
+            ], "Codes and index columns should keep their padding"
+            assert [row[4] for row in stored[2]] == [1.0, 2.0, 2.5]
+
+    def test_bulk_load_session(self):
+        """Test the bulk-load profile defers FTS content and restores safe settings"""
+        import tempfile
+        import bulk_load
+        from create_database import index_csv_to_sqlite
+
+        with tempfile.TemporaryDirectory() as workdir:
+            csv_path = os.path.join(workdir, "codes.csv")
+            db_path = os.path.join(workdir, "codes.db")
+            with open(csv_path, "w") as f:
+                f.write("Code,Title\n")
+                for n in range(30):
+                    f.write(f"TM{n},{'Fever' if n % 3 == 0 else 'Cough'} disorder {n}\n")
+
+            with bulk_load.bulk_session(db_path):
+                assert bulk_load.deferring_indexes()
+                conn = bulk_load.connect(db_path)
+                assert conn.execute("PRAGMA synchronous").fetchone()[0] == 0
+                assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2
+                conn.close()
+                index_csv_to_sqlite(csv_path, db_path, "icd11", fts_table_name="icd11_fts",
+                                    fts_columns=["code", "title"], index_columns=["code"], chunksize=8)
+            assert not bulk_load.deferring_indexes()
+
+            conn = sqlite3.connect(db_path)
+            try:
+                assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+                assert conn.execute("SELECT count(*) FROM icd11_fts WHERE icd11_fts MATCH 'fever'").fetchone()[0] == 10
+                conn.execute("INSERT INTO icd11_fts(icd11_fts) VALUES ('integrity-check')")
+                stats = {row[0] for row in conn.execute("SELECT tbl FROM sqlite_stat1")}
+                assert "icd11" in stats, "ANALYZE should run when the session ends"
+            finally:
+                conn.close()
+
+    def test_code_match_insertion_order(self):
+        """Test the code-index mapping passes insert the same rows, in the same order, as the FTS joins"""
+        import contextlib
+        import io
+        import tempfile
+        from create_database import index_csv_to_sqlite
+        from create_concept_map import _normalize_code_text, create_concept_map_table, create_precise_mappings
+
+        # The exact and bracket code passes as they were written against the FTS tables
+        legacy_passes = [
+            """
+            INSERT INTO legacy_map (source_code, target_code)
+            SELECT DISTINCT n.namc_code, i.code
+            FROM nam_fts n
+            JOIN icd11_fts i ON n.namc_code = i.code
+            WHERE n.namc_code IS NOT NULL AND i.code IS NOT NULL AND i.code != ''
+            """,
+            """
+            INSERT INTO legacy_map (source_code, target_code)
+            SELECT DISTINCT n.namc_code, i.code
+            FROM nam_fts n
+            JOIN icd11_fts i ON TRIM(SUBSTR(n.namc_code, 1, CASE
+                WHEN INSTR(n.namc_code, ' (') > 0 THEN INSTR(n.namc_code, ' (') - 1
+                ELSE LENGTH(n.namc_code)
+            END)) = TRIM(i.code)
+            WHERE n.namc_code IS NOT NULL AND i.code IS NOT NULL AND i.code != ''
+              AND INSTR(n.namc_code, ' (') > 0
+              AND NOT EXISTS (
+                SELECT 1 FROM legacy_map cm WHERE cm.source_code = n.namc_code AND cm.target_code = i.code
+            )
+            """,
+        ]
+
+        with tempfile.TemporaryDirectory() as workdir:
+            db_path = os.path.join(workdir, "mappings.db")
+            icd11_csv = os.path.join(workdir, "icd11.csv")
+            nam_csv = os.path.join(workdir, "nam.csv")
+            with open(icd11_csv, "w") as f:
+                f.write("Code,Title\n")
+                for code in ["SR12", "SR10", "SR11", "SR10", "SR13 ", "SR14", "", "SR15"]:
+                    f.write(f"{code},title {code}\n")
+            with open(nam_csv, "w") as f:
+                f.write("NAMC_CODE,NAMC_TERM,Name English,Name English Under Index\n")
+                for code in ["SR11", "SR10 (AAA-1)", "SR10", "SR12 (B)", "SR10 (AAA-1)", "SR99",
+                             "SR13 (C)", "SR15  (D)", "SR14", "SR12"]:
+                    f.write(f"{code},term,,\n")
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                index_csv_to_sqlite(icd11_csv, db_path, "icd11", fts_table_name="icd11_fts",
+                                    fts_columns=["code", "title"], index_columns=["code"])
+                index_csv_to_sqlite(nam_csv, db_path, "nam", fts_table_name="nam_fts",
+                                    fts_columns=["namc_code", "namc_term"], index_columns=["namc_code"])
+                create_concept_map_table(db_path)
+                create_precise_mappings(db_path)
+
+            conn = sqlite3.connect(db_path)
+            try:
+                mapped = conn.execute("SELECT source_code, target_code FROM concept_map ORDER BY id").fetchall()
+                conn.execute("CREATE TEMP TABLE legacy_map (source_code TEXT, target_code TEXT)")
+                for sql in legacy_passes:
+                    conn.execute(sql)
+                legacy = [
+                    (_normalize_code_text(source), _normalize_code_text(target))
+                    for source, target in conn.execute("SELECT source_code, target_code FROM legacy_map ORDER BY rowid")
+                ]
+            finally:
+                conn.close()
+            assert len(mapped) >= 6
+            assert mapped == legacy
+
+    def test_parallel_ingestion(self):
+        """Test staged parallel import matches a serial import, FTS index included"""
+        import tempfile
+        from create_database import index_csv_to_sqlite, index_csvs_in_parallel
+
+        with tempfile.TemporaryDirectory() as workdir:
+            sources = []
+            for table, prefix in (("icd11", "TM"), ("nam", "SR")):
+                csv_path = os.path.join(workdir, f"{table}.csv")
+                with open(csv_path, "w") as f:
+                    f.write("Code,Title\n")
+                    for n in range(40):
+                        f.write(f"{prefix}{n},{'Fever' if n % 4 == 0 else 'Cough'} pattern {n}\n")
+                sources.append(dict(csv_path=csv_path, table_name=table, fts_table_name=f"{table}_fts",
+                                    fts_columns=["code", "title"], index_columns=["code"]))
+
+            serial_path = os.path.join(workdir, "serial.db")
+            parallel_path = os.path.join(workdir, "parallel.db")
+            for source in sources:
+                index_csv_to_sqlite(db_path=serial_path, **source)
+            index_csvs_in_parallel(sources, parallel_path, workers=2)
+
+            serial = sqlite3.connect(serial_path)
+            parallel = sqlite3.connect(parallel_path)
+            try:
+                for table in ("icd11", "nam"):
+                    query = f"SELECT rowid, * FROM {table} ORDER BY rowid"
+                    assert parallel.execute(query).fetchall() == serial.execute(query).fetchall()
+                    match = f"SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH 'fever' ORDER BY rowid"
+                    assert len(parallel.execute(match).fetchall()) == 10
+                    assert parallel.execute(match).fetchall() == serial.execute(match).fetchall()
+                    parallel.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('integrity-check')")
+                    indexes = {row[1] for row in parallel.execute(f"PRAGMA index_list('{table}')")}
+                    assert f"idx_{table}_code" in indexes
+                assert not [name for name in os.listdir(workdir) if name.startswith("staging-")]
+            finally:
+                serial.close()
+                parallel.close()
+
+    def test_incremental_reingestion(self):
+        """Test re-imports skip unchanged files and apply only row-level changes, FTS included"""
+        import tempfile
+        from create_database import index_csv_to_sqlite
+
+        def write_csv(path, rows):
+            with open(path, "w") as f:
+                f.write("NAMC_CODE,NAMC_TERM\n")
+                for code, term in rows:
+                    f.write(f"{code},{term}\n")
+
+        with tempfile.TemporaryDirectory() as workdir:
+            csv_path = os.path.join(workdir, "nam.csv")
+            db_path = os.path.join(workdir, "nam.db")
+            source = dict(csv_path=csv_path, db_path=db_path, table_name="nam", fts_table_name="nam_fts",
+                          fts_columns=["namc_code", "namc_term"], index_columns=["namc_code"], chunksize=7)
+            rows = [(f"SR{n}", f"vata pattern {n}") for n in range(20)]
+            write_csv(csv_path, rows)
+            index_csv_to_sqlite(**source)
+
+            conn = sqlite3.connect(db_path)
+            try:
+                before = conn.execute("SELECT rowid, namc_code FROM nam ORDER BY rowid").fetchall()
+            finally:
+                conn.close()
+
+            # Unchanged file: nothing is appended
+            index_csv_to_sqlite(**source)
+            # Updated release: one changed term, two removed codes, one new code
+            rows[3] = ("SR3", "pitta pattern 3")
+            del rows[10:12]
+            rows.append(("SR99", "kapha pattern 99"))
+            write_csv(csv_path, rows)
+            index_csv_to_sqlite(**source)
+
+            conn = sqlite3.connect(db_path)
+            try:
+                after = conn.execute("SELECT rowid, namc_code, namc_term FROM nam ORDER BY rowid").fetchall()
+                assert [(code, term) for _, code, term in after] == \
+                    [row for row in rows if row[0] != "SR99"] + [("SR99", "kapha pattern 99")]
+                kept = {code: rowid for rowid, code in before}
+                assert all(kept[code] == rowid for rowid, code, _ in after if code in kept), \
+                    "Unchanged and updated rows should keep their rowids"
+
+                def matches(term):
+                    return [row[0] for row in conn.execute(
+                        "SELECT nam.namc_code FROM nam_fts JOIN nam ON nam.rowid = nam_fts.rowid "
+                        "WHERE nam_fts MATCH ? ORDER BY nam.rowid", (term,))]
+                assert matches("pitta") == ["SR3"]
+                assert matches("kapha") == ["SR99"]
+                assert "SR3" not in matches("vata") and "SR10" not in matches("vata")
+                assert len(matches("vata")) == 17
+                conn.execute("INSERT INTO nam_fts(nam_fts) VALUES ('integrity-check')")
+                assert conn.execute("SELECT row_count FROM ingest_state WHERE table_name = 'nam'").fetchone()[0] == 19
+            finally:
+                conn.close()
+
+    def test_reingestion_numeric_looking_codes(self):
+        """Test re-importing an equivalent CSV with all-digit codes reports no changes"""
+        import contextlib
+        import io
+        import tempfile
+        from create_database import index_csv_to_sqlite
+
+        with tempfile.TemporaryDirectory() as workdir:
+            csv_path = os.path.join(workdir, "icd11.csv")
+            db_path = os.path.join(workdir, "icd11.db")
+            source = dict(csv_path=csv_path, db_path=db_path, table_name="icd11", fts_table_name="icd11_fts",
+                          fts_columns=["code", "title"], index_columns=["code"], chunksize=2)
+
+            def write_csv(chapter_format):
+                with open(csv_path, "w") as f:
+                    f.write("Code,Title,Chapter No\n")
+                    for n, code in enumerate(["SR1", "SR2", "0000", "0042", "7"]):
+                        f.write(f"{code},title {n},{chapter_format.format(n)}\n")
+
+            write_csv("{}")
+            index_csv_to_sqlite(**source)
+            # Same rows, written differently: the file hash changes but no value does
+            write_csv("{}.0")
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                index_csv_to_sqlite(**source)
+            assert "0 inserted, 0 updated, 0 deleted" in output.getvalue()
+
+            conn = sqlite3.connect(db_path)
+            try:
+                assert conn.execute("SELECT code, chapter_no FROM icd11 ORDER BY rowid").fetchall() == \
+                    [("SR1", 0), ("SR2", 1), ("0000", 2), ("0042", 3), ("7", 4)]
+            finally:
+                conn.close()
+
+    def test_fts_sync_triggers(self):
+        """Test FTS indexes follow later writes and the maintenance commands report and repair them"""
+        import tempfile
+        from create_database import index_csv_to_sqlite
+        from fts_maintenance import UNKNOWN, maintain, parse_structure
+
+        with tempfile.TemporaryDirectory() as workdir:
+            csv_path = os.path.join(workdir, "nam.csv")
+            db_path = os.path.join(workdir, "nam.db")
+            with open(csv_path, "w") as f:
+                f.write("NAMC_CODE,NAMC_TERM\n")
+                for n in range(30):
+                    f.write(f"SR{n},vata  pattern {n}\n")
+            index_csv_to_sqlite(csv_path, db_path, "nam", fts_table_name="nam_fts",
+                                fts_columns=["namc_code", "namc_term"], index_columns=["namc_code"])
+
+            conn = sqlite3.connect(db_path)
+            try:
+                # Later writes, such as whitespace normalization, reach the index through the triggers
+                for n in range(10):
+                    conn.execute("UPDATE nam SET namc_term = replace(namc_term, 'vata', 'pitta') WHERE namc_code = ?",
+                                 (f"SR{n}",))
+                    conn.commit()
+                conn.execute("DELETE FROM nam WHERE namc_code = 'SR29'")
+                conn.execute("INSERT INTO nam VALUES ('SR99', 'kapha pattern 99')")
+                conn.commit()
+                assert conn.execute("SELECT count(*) FROM nam_fts WHERE nam_fts MATCH 'pitta'").fetchone()[0] == 10
+                assert conn.execute("SELECT count(*) FROM nam_fts WHERE nam_fts MATCH 'vata'").fetchone()[0] == 19
+                assert conn.execute("SELECT count(*) FROM nam_fts WHERE nam_fts MATCH 'kapha'").fetchone()[0] == 1
+            finally:
+                conn.close()
+
+            [entry] = maintain(db_path, "integrity-check")
+            assert entry["result"]["ok"]
+            assert entry["before"]["documents"] == 30
+            assert entry["before"]["segments"] > 1, "Each committed write adds a segment"
+
+            [entry] = maintain(db_path, "optimize", ["nam_fts"])
+            assert entry["after"]["segments"] == 1
+            assert entry["after"]["index_bytes"] > 0
+            assert entry["after"]["data_blocks"] < entry["before"]["data_blocks"]
+
+            # A structure record that does not decode cleanly is reported, not misread
+            conn = sqlite3.connect(db_path)
+            try:
+                record = conn.execute("SELECT block FROM nam_fts_data WHERE rowid = 10").fetchone()[0]
+                for malformed in (record[:-1], record + b"\x00"):
+                    try:
+                        parse_structure(malformed)
+                    except ValueError:
+                        pass
+                    else:
+                        raise AssertionError(f"Malformed structure record {malformed.hex()} was accepted")
+                conn.execute("UPDATE nam_fts_data SET block = ? WHERE rowid = 10", (record + b"\x00",))
+                conn.commit()
+                [entry] = maintain(db_path, "report")
+                assert entry["before"]["segments"] == UNKNOWN and entry["before"]["levels"] == UNKNOWN
+                assert entry["before"]["documents"] == 30
+                conn.execute("UPDATE nam_fts_data SET block = ? WHERE rowid = 10", (record,))
+                conn.commit()
+            finally:
+                conn.close()
+
+            # Without its trigger the index goes stale; integrity-check notices and rebuild repairs it
+            conn = sqlite3.connect(db_path)
+            try:
+                conn.execute("DROP TRIGGER nam_fts_au")
+                conn.execute("UPDATE nam SET namc_term = 'stale' WHERE namc_code = 'SR15'")
+                conn.commit()
+            finally:
+                conn.close()
+            assert not maintain(db_path, "integrity-check")[0]["result"]["ok"]
+            maintain(db_path, "rebuild")
+            assert maintain(db_path, "integrity-check")[0]["result"]["ok"]
+
+    def test_executor_backpressure(self):
+        """Test that the database executor rejects work beyond its pending limit"""
+        executor = db.BlockingExecutor(max_workers=1, max_pending=2)
+
+        async def scenario():
+            slow = [asyncio.ensure_future(executor.run(time.sleep, 0.2)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            try:
+                await executor.run(time.sleep, 0)
+                rejected = False
+            except db.Overloaded:
+                rejected = True
+            await asyncio.gather(*slow)
+            return rejected
+
+        try:
+            assert asyncio.run(scenario()), "Third concurrent call should be rejected"
+            stats = executor.stats()
+            assert stats["rejected"] == 1
+            assert stats["pending"] == 0
+            assert stats["completed"] == 2
+        finally:
+            executor.shutdown()
+
 def run_tests():
     """Run all tests manually (for environments without pytest)"""
     test_class = TestConceptMapLogic()
@@ -173,9 +820,27 @@ def run_tests():
         ("Database Connection", test_class.test_database_connection),
         ("Data Quality", test_class.test_concept_map_data_quality),
         ("Fetch Function", test_class.test_fetch_concept_map_function),
+        ("Batched Displays", test_class.test_batched_display_resolution),
+        ("Bulk Resolution", test_class.test_bulk_resolution),
         ("Mapping Consistency", test_class.test_namaste_icd11_mapping_consistency),
         ("Code Normalization", test_class.test_code_normalization),
         ("Ayurveda Patterns", test_class.test_ayurveda_pattern_mapping),
+        ("Source Key Index", test_class.test_source_key_index),
+        ("Reverse Translation", test_class.test_reverse_translation),
+        ("Connection Pool", test_class.test_connection_pool_reuse),
+        ("Snapshot Lookups", test_class.test_snapshot_matches_database),
+        ("Snapshot Hot Reload", test_class.test_snapshot_hot_reload),
+        ("LRU Cache Eviction", test_class.test_lru_cache_eviction),
+        ("Metrics Overhead", test_class.test_metrics_overhead),
+        ("Microbenchmarks", test_class.test_microbenchmarks_run),
+        ("Streaming CSV Ingestion", test_class.test_streaming_csv_ingestion),
+        ("Bulk Load Session", test_class.test_bulk_load_session),
+        ("Code Match Insertion Order", test_class.test_code_match_insertion_order),
+        ("Parallel Ingestion", test_class.test_parallel_ingestion),
+        ("Incremental Re-ingestion", test_class.test_incremental_reingestion),
+        ("Numeric-Looking Code Re-import", test_class.test_reingestion_numeric_looking_codes),
+        ("FTS Sync Triggers", test_class.test_fts_sync_triggers),
+        ("Executor Backpressure", test_class.test_executor_backpressure),
     ]
     
     print("RUNNING CONCEPT MAP LOGIC TESTS")